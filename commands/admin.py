@@ -13,7 +13,7 @@ from discord import enums
 from discord.ext import commands
 
 from commands import userdb, background, mal
-from utils import database, shared, checks, utils, bot
+from utils import database, shared, checks, utils, bot, fetch_scheduler
 
 class Admin:
     def __init__(self, bot):
@@ -152,8 +152,8 @@ class Admin:
             name = await utils.require_mal_username(ctx, ctx.message.author)
 
         if name:
-            alist = await shared.cache.require_entity_list(ctx, name, entity='anime', force_reload=True)
-            mlist = await shared.cache.require_entity_list(ctx, name, entity='manga', force_reload=True)
+            alist = await shared.cache.require_entity_list(ctx, name, entity='anime', force_reload=True, incremental=True, priority=fetch_scheduler.PRIORITY_INTERACTIVE)
+            mlist = await shared.cache.require_entity_list(ctx, name, entity='manga', force_reload=True, incremental=True, priority=fetch_scheduler.PRIORITY_INTERACTIVE)
             if alist and mlist:
                 await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
                 return
@@ -283,6 +283,22 @@ Display name (from mal): {lookup.display_name_from_mal(_user_get_mal_name(lookup
         else:
             await ctx.bot.say('No user command running')
 
+    @commands.command(pass_context=True, hidden=True)
+    @checks.is_owner()
+    async def httpstats(self, ctx):
+        stats = ctx.bot.http_pool.statistics()
+        message = f'Requests: {stats["requests"]} ({stats["failures"]} failures, {stats["timeouts"]} timeouts)\n'
+        message += 'Downloaded: {0:.1f} MB\n'.format(stats['bytes'] / (1024 * 1024))
+        message += f'Connections: {stats["active_connections"]} active, {stats["idle_connections"]} idle\n'
+        message += f'Limits: {ctx.bot.http_pool.limit} total, {ctx.bot.http_pool.limit_per_host} per host\n'
+        fetches = shared.cache.scheduler.statistics()
+        message += f'List fetches: {fetches["completed"]} done, {fetches["failed"]} failed, {fetches["coalesced"]} coalesced, {fetches["running"]} running, {fetches["pending"]} queued\n'
+        if stats['hosts']:
+            message += '\n'
+            for host, count in sorted(stats['hosts'].items(), key=lambda x: x[1], reverse=True):
+                message += f'{host}: {count}\n'
+        await ctx.bot.say(message)
+
     @commands.command(pass_context=True, hidden=True)
     @checks.is_owner()
     async def clearbotstate(self, ctx):
@@ -22,44 +22,44 @@ class AdminDB:
     @commands.command(pass_context=True, hidden=True)
     @checks.is_owner()
     async def purgedb(self, ctx, mal_name, field_name):
-        session = database.new_session()
-        user = session.query(database.User).filter(database.User.mal_name == mal_name).first()
+        with database.session_scope() as session:
+            user = session.query(database.User).filter(database.User.mal_name == mal_name).first()
 
-        if not user:
-            user = session.query(database.User).filter(database.User.discord_id == mal_name).first()
             if not user:
-                await ctx.bot.say(f"No user found for name \"{mal_name}\"")
+                user = session.query(database.User).filter(database.User.discord_id == mal_name).first()
+                if not user:
+                    await ctx.bot.say(f"No user found for name \"{mal_name}\"")
+                    return
+
+            if field_name == '*':
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                db_remove_user(session, user)
+                session.commit()
+            elif field_name in ['mal_name', 'gender', 'birthdate', 'bio', 'timezone']:
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                setattr(user, field_name, None)
+                session.commit()
+            elif field_name == 'languages':
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                db_remove_language(session, user)
+                session.commit()
+            elif field_name == 'prog_languages':
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                db_remove_prod_language(session, user)
+                session.commit()
+            elif field_name == 'projects':
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                db_remove_projects(session, user)
+                session.commit()
+            elif field_name == 'extras':
+                backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
+                db_remove_extras(session, user)
+                session.commit()
+            else:
+                await ctx.bot.say(f'Unrecognized field "{field_name}"')
                 return
 
-        if field_name == '*':
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            db_remove_user(session, user)
-            session.commit()
-        elif field_name in ['mal_name', 'gender', 'birthdate', 'bio', 'timezone']:
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            setattr(user, field_name, None)
-            session.commit()
-        elif field_name == 'languages':
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            db_remove_language(session, user)
-            session.commit()
-        elif field_name == 'prog_languages':
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            db_remove_prod_language(session, user)
-            session.commit()
-        elif field_name == 'projects':
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            db_remove_projects(session, user)
-            session.commit()
-        elif field_name == 'extras':
-            backup_db(extra_name=f'-purge-{mal_name}-{field_name}')
-            db_remove_extras(session, user)
-            session.commit()
-        else:
-            await ctx.bot.say(f'Unrecognized field "{field_name}"')
-            return
-
-        await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
+            await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
 
     @commands.group(pass_context=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
@@ -68,13 +68,13 @@ class AdminDB:
 
     @db.command(pass_context=True)
     async def users(self, ctx, fmt='{0}:{1}'):
-        session = database.new_session()
-        users = session.query(database.User).all()
+        with database.session_scope() as session:
+            users = session.query(database.User).all()
 
-        message = ''
-        for user in users:
-            message += fmt.format(user.discord_id, user.mal_name) + '\n'
-        await ctx.bot.say(f'```{message}```')
+            message = ''
+            for user in users:
+                message += fmt.format(user.discord_id, user.mal_name) + '\n'
+            await ctx.bot.say(f'```{message}```')
 
 def backup_db(extra_name = ''):
     current_time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
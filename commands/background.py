@@ -6,7 +6,7 @@ import random
 from functools import reduce
 from discord import enums
 from discord.ext import commands
-from utils import shared
+from utils import shared, database
 from commands import admin, birthday
 
 class Background:
@@ -24,10 +24,21 @@ class Background:
     async def run_list_cache(self):
         await self.bot.wait_until_ready()
 
+        only_stale = True
         while not self.bot.is_closed:
-            await shared.cache.preload_all()
+            await shared.cache.preload_all(only_stale=only_stale)
+            only_stale = False
             await asyncio.sleep(3600 * 12)
 
+    async def run_avatar_cache(self):
+        await self.bot.wait_until_ready()
+
+        while not self.bot.is_closed:
+            with database.session_scope() as session:
+                mal_names = [user.mal_name for user in session.query(database.User).filter(database.User.mal_name.isnot(None)).all()]
+            await shared.avatars.refresh_stale(mal_names)
+            await asyncio.sleep(3600)
+
     async def update_avatar(self):
         await self.bot.wait_until_ready()
 
@@ -186,6 +197,8 @@ def setup(bot, config):
     bot.loop.create_task(background.run_game_status())
     if config['preload_lists']:
         bot.loop.create_task(background.run_list_cache())
+    if config.get('cache_avatars', True):
+        bot.loop.create_task(background.run_avatar_cache())
     if config['update_avatar']:
         bot.loop.create_task(background.update_avatar())
     if config['wish_birthday']:
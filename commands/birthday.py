@@ -23,8 +23,8 @@ async def check_birthdays(bot):
     print(f'checking birthdays {datetime.datetime.utcnow()}')
     utils.write_property('last_birthday_check', datetime.datetime.utcnow().strftime('%Y-%m-%d'))
 
-    session = database.new_session()
-    users = session.query(database.User).filter(database.User.birthdate.isnot(None)).all()
+    with database.session_scope() as session:
+        users = session.query(database.User).filter(database.User.birthdate.isnot(None)).all()
 
     today = datetime.datetime.utcnow().strftime('%Y-%m-%d')
     for user in users:
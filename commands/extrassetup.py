@@ -32,15 +32,15 @@ class ExtrasSetup:
     @extrasdb.command(pass_context=True)
     @checks.is_owner()
     async def list(self, ctx):
-        session = database.new_session()
-        extras = session.query(database.Extras).all()
+        with database.session_scope() as session:
+            extras = session.query(database.Extras).all()
 
-        message = ''
-        for extra in extras:
-            options = f' => {extra.options}' if extra.options else ''
-            message += f'**{extra.id}** - {extra.question}{options}\n'
+            message = ''
+            for extra in extras:
+                options = f' => {extra.options}' if extra.options else ''
+                message += f'**{extra.id}** - {extra.question}{options}\n'
 
-        await utils.safe_say(ctx, message)
+            await utils.safe_say(ctx, message)
 
     @extrasdb.command(pass_context=True)
     @checks.is_owner()
@@ -48,58 +48,58 @@ class ExtrasSetup:
         parts = raw.split('=>')
 
         question = parts[0].strip()
-        session = database.new_session()
-        new_extra = database.Extras(question=question)
+        with database.session_scope() as session:
+            new_extra = database.Extras(question=question)
 
-        if len(parts) > 1:
-            options = parts[1].strip()
-            new_extra.options = options
+            if len(parts) > 1:
+                options = parts[1].strip()
+                new_extra.options = options
 
-        session.add(new_extra)
-        session.commit()
+            session.add(new_extra)
+            session.commit()
 
-        await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
+            await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
 
     @extrasdb.command(pass_context=True, aliases=['update'])
     @checks.is_owner()
     async def edit(self, ctx, id, *, raw):
-        session = database.new_session()
-        extra = session.query(database.Extras).filter(database.Extras.id == id).first()
+        with database.session_scope() as session:
+            extra = session.query(database.Extras).filter(database.Extras.id == id).first()
 
-        if extra:
-            parts = raw.split('=>')
+            if extra:
+                parts = raw.split('=>')
 
-            question = parts[0].strip()
-            extra.question = question
+                question = parts[0].strip()
+                extra.question = question
 
-            if len(parts) > 1:
-                options = parts[1].strip()
-                extra.options = options
-            else:
-                extra.options = None
+                if len(parts) > 1:
+                    options = parts[1].strip()
+                    extra.options = options
+                else:
+                    extra.options = None
 
-            session.commit()
+                session.commit()
 
-            await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
-        else:
-            await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
+                await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
+            else:
+                await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
 
     @extrasdb.command(pass_context=True, aliases=['remove'])
     @checks.is_owner()
     async def rm(self, ctx, id):
-        session = database.new_session()
-        extra = session.query(database.Extras).filter(database.Extras.id == id).first()
+        with database.session_scope() as session:
+            extra = session.query(database.Extras).filter(database.Extras.id == id).first()
 
-        if extra:
-            user_extras = session.query(database.UserExtras).filter(database.UserExtras.extras_id == extra.id).all()
-            for item in user_extras:
-                session.delete(item)
+            if extra:
+                user_extras = session.query(database.UserExtras).filter(database.UserExtras.extras_id == extra.id).all()
+                for item in user_extras:
+                    session.delete(item)
 
-            session.delete(extra)
-            session.commit()
-            await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
-        else:
-            await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
+                session.delete(extra)
+                session.commit()
+                await ctx.bot.add_reaction(ctx.message, shared.reaction_ok)
+            else:
+                await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
 
 def setup(bot):
     bot.add_cog(ExtrasSetup(bot))
@@ -308,6 +308,18 @@ class Help:
                     'args': '',
                     'usage': 'Clears all lists cache.'
                 },
+                'httpstats': {
+                    'args': '',
+                    'usage': 'Displays the shared HTTP connection pool statistics.'
+                },
+                'vndbstats': {
+                    'args': '',
+                    'usage': 'Displays the VNDB query cache statistics.'
+                },
+                'romajistats': {
+                    'args': '',
+                    'usage': 'Displays the romanization cache statistics.'
+                },
                 'admin': {
                     'args': '',
                     'usage': 'Starts André\'s interactive mode.'
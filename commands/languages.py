@@ -1,21 +1,33 @@
 #!/usr/bin/env python3
 
 import asyncio
+import concurrent.futures
 import discord
+import functools
 import re
 from discord.ext import commands
 
 import googletrans
 
-from kanji_to_romaji import kanji_to_romaji
+from kanji_to_romaji import RomajiCache, load_mappings, romanize_blocks, warm_mappings
 from utils import shared, utils, checks
 
 moonrunes_auto_channel = utils.read_property('moonrunes_auto_channel')
+romaji_cache = RomajiCache(utils.read_property('romaji_cache_size', 2048))
+romaji_workers = utils.read_property('romaji_workers', 1)
+translate_timeout = utils.read_property('translate_timeout', 10)
+romaji_pool = None
 
 class Languages:
     def __init__(self, bot):
         self.bot = bot
 
+    def __unload(self):
+        global romaji_pool
+        if romaji_pool:
+            romaji_pool.shutdown(wait=False)
+            romaji_pool = None
+
     async def on_message(self, message):
         if message.author != self.bot.user:
             if not message.content.strip().startswith(self.bot.command_prefix):
@@ -37,7 +49,7 @@ class Languages:
             langs = ['auto', 'en']
 
         try:
-            message = googletrans.Translator().translate(content, dest=langs[1], src=langs[0])
+            message = await translate_text(content, dest=langs[1], src=langs[0])
             await ctx.bot.say(message.text)
         except:
             await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
@@ -48,7 +60,7 @@ class Languages:
         if ctx.invoked_subcommand is None:
             items = ctx.message.content.split(' ', 1)
             if len(items) > 1:
-                await ctx.bot.say(translate_jp(items[1].strip()))
+                await ctx.bot.say(await translate_jp(items[1].strip()))
             else:
                 await translate_history(ctx.bot, ctx.message.channel)
 
@@ -65,6 +77,14 @@ class Languages:
             moonrunes_auto_channel = None
             await ctx.bot.add_reaction(ctx.message, shared.reaction_ko)
 
+    @commands.command(pass_context=True, hidden=True)
+    @checks.is_owner()
+    async def romajistats(self, ctx):
+        stats = romaji_cache.statistics()
+        message = f'Cached romanizations: {stats["entries"]}/{romaji_cache.max_entries}\n'
+        message += 'Hits: {} / Misses: {} ({:.1f}% hit rate)'.format(stats['hits'], stats['misses'], stats['hit_rate'] * 100)
+        await ctx.bot.say(message)
+
 hiragana_full = '[ぁ-ゟ]'
 katakana_full = '[゠-ヿ]'
 kanji = '[㐀-䶵一-鿋豈-頻]'
@@ -73,10 +93,44 @@ katakana_half_width = '[｟-ﾟ]'
 kanas = f'{hiragana_full}|{katakana_full}|{katakana_half_width}'
 japanese = f'{kanas}|{kanji}'
 
-def translate_jp(content):
-    romaji = kanji_to_romaji(content)
-    translation = googletrans.Translator().translate(content, src='ja')
-    return f'`{content}` *{romaji}*\n> {translation.text}'
+def get_romaji_pool():
+    # Worker processes load the mappings once when they start instead of on their first block
+    global romaji_pool
+    if romaji_pool is None:
+        romaji_pool = concurrent.futures.ProcessPoolExecutor(max_workers=romaji_workers, initializer=load_mappings)
+    return romaji_pool
+
+async def romanize(blocks):
+    global romaji_pool
+    if romaji_workers == 0:
+        return romaji_cache.romanize_many(blocks)
+
+    found, missing = romaji_cache.lookup(blocks)
+    if missing:
+        try:
+            romaji = await asyncio.get_event_loop().run_in_executor(get_romaji_pool(), romanize_blocks, missing)
+        except concurrent.futures.BrokenExecutor:
+            print('Romaji worker died, restarting the pool')
+            romaji_pool.shutdown(wait=False)
+            romaji_pool = None
+            romaji = await asyncio.get_event_loop().run_in_executor(get_romaji_pool(), romanize_blocks, missing)
+        romaji_cache.store(missing, romaji)
+        found.update(zip(missing, romaji))
+    return [found[block] for block in blocks]
+
+async def translate_text(content, **kwargs):
+    # googletrans is blocking, run it in the default executor so it can't hold up the event loop
+    translate = functools.partial(googletrans.Translator().translate, content, **kwargs)
+    return await asyncio.wait_for(asyncio.get_event_loop().run_in_executor(None, translate), translate_timeout)
+
+async def translate_jp(content, romaji=None):
+    if romaji is None:
+        romaji = (await romanize([content]))[0]
+    try:
+        translation = (await translate_text(content, src='ja')).text
+    except asyncio.TimeoutError:
+        translation = '*Translation timed out*'
+    return f'`{content}` *{romaji}*\n> {translation}'
 
 def percentage_of_moonrunes(content):
     total_len = len(content)
@@ -85,32 +139,39 @@ def percentage_of_moonrunes(content):
         moon_len += len(block.group(0))
     return moon_len / total_len if total_len > 0 else 0
 
-def extract_all_translation(content):
+async def translate_blocks(blocks):
+    # Romanizes every block in one batch, repeated blocks are only converted once
+    romaji = await romanize([block for block, _ in blocks])
+    translations = await asyncio.gather(*[translate_jp(block, block_romaji) for (block, _), block_romaji in zip(blocks, romaji)])
+    return ''.join(f'{translation}{separator}' for translation, (_, separator) in zip(translations, blocks))
+
+async def extract_all_translation(content):
     should_extract_all = shared.emote_wk in content
-    _, message = full_extract_all_translation(content, previous_matches=[], should_extract_all=should_extract_all)
-    return message
+    _, blocks = extract_translation_blocks(content, previous_matches=[], should_extract_all=should_extract_all)
+    return await translate_blocks(blocks) if blocks else None
 
-def full_extract_all_translation(content, previous_matches, should_extract_all):
-    message = ''
+def extract_translation_blocks(content, previous_matches, should_extract_all):
+    """Returns the (block, separator) pairs of content to translate"""
     if percentage_of_moonrunes(content) >= 0.8:
         previous_matches.append(content)
-        return previous_matches, f'{translate_jp(content)}\n'
+        return previous_matches, [(content, '\n')]
 
+    blocks = []
     for block in extract_jap_block(content):
         m = block.group(0)
         if should_extract_all or not re.fullmatch(f'({kanas})+', m):
             if m not in previous_matches:
-                message += f'{translate_jp(m)}\n\n'
+                blocks.append((m, '\n\n'))
                 previous_matches.append(m)
 
-    return previous_matches, (message if len(message) > 0 else None)
+    return previous_matches, blocks
 
 async def process_message(bot, message):
     global moonrunes_auto_channel
     if checks.is_banned_check(message, checks.PermissionLevel.Unsafe):
         return False
     if moonrunes_auto_channel and moonrunes_auto_channel == message.channel.id:
-        translation = extract_all_translation(message.content)
+        translation = await extract_all_translation(message.content)
         if translation:
             await bot.send_message(message.channel, translation)
             return True
@@ -119,24 +180,26 @@ async def process_message(bot, message):
     return False
 
 async def translate_history(bot, channel):
-    output = ''
+    blocks = []
     all_matches = []
     async for message in bot.logs_from(channel, limit=10):
-        if message.author != bot.user:
-            if not checks.is_banned_check(message, checks.PermissionLevel.Unsafe):
-                all_matches, translation = full_extract_all_translation(message.content, all_matches, should_extract_all=True)
-                if translation:
-                    output += translation
-        else:
-            if output:
-                await bot.send_message(channel, output)
-            return
-    if output:
-        await bot.send_message(channel, output)
+        if message.author == bot.user:
+            break
+        if not checks.is_banned_check(message, checks.PermissionLevel.Unsafe):
+            all_matches, message_blocks = extract_translation_blocks(message.content, all_matches, should_extract_all=True)
+            blocks += message_blocks
+    if blocks:
+        await bot.send_message(channel, await translate_blocks(blocks))
 
 def extract_jap_block(string):
     return re.finditer(f'({japanese})+', string)
 
 
 def setup(bot):
+    # Loads the romaji mappings now instead of on the first Japanese message
+    if utils.read_property('warm_romaji_mappings', True):
+        if romaji_workers > 0:
+            get_romaji_pool().submit(load_mappings)
+        else:
+            warm_mappings()
     bot.add_cog(Languages(bot))
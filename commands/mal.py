@@ -5,14 +5,14 @@ import discord
 import datetime
 import random
 import html2text
-import urllib.parse, urllib.request, json
+import urllib.parse
 from decimal import Decimal
 from statistics import mean
 from discord.ext import commands
 from babel.dates import format_timedelta
 
 from commands import userdb
-from utils import database, shared, utils, checks
+from utils import database, shared, utils, checks, columnar
 
 class MAL:
     def __init__(self, bot):
@@ -119,7 +119,7 @@ class MAL:
         await self.search_entity(ctx, name, 'manga')
 
     async def search_entity(self, ctx, name, entity):
-        lists = await shared.cache.require_entity_lists(ctx, entity)
+        lists = await shared.cache.require_entity_lists(ctx, entity, partial=True)
         entity_data, from_search = await self.get_entity_from_string(ctx, name, entity)
 
         # Clannad/AS easter egg
@@ -183,6 +183,7 @@ class MAL:
         description += '*nulls score:* ' + ('?' if avg_score is None else '{0:.2f}'.format(avg_score)) + '\n\n'
 
         description += build_entity_stats(ctx, entity_data, lists, entity, easter_egg=easter_egg)
+        description += partial_notice(lists)
 
         message.description = description
         await ctx.bot.say(embed=message)
@@ -213,7 +214,7 @@ class MAL:
 
         user_lookup = utils.UserLookup(ctx.bot)
         items_to_display = []
-        for user, list in lists.items():
+        for user, user_data in shared.cache.entries_for_id(entity, entity_data['id']).items():
             user_display_name = user_lookup.display_name_from_mal(user)
 
             if entity == 'anime':
@@ -225,8 +226,7 @@ class MAL:
                 start_key = 'reading_start'
                 end_key = 'reading_end'
 
-            user_data = next((x for x in list if x['id'] == entity_data['id']), None)
-            if user_data and (start_key in user_data or end_key in user_data):
+            if start_key in user_data or end_key in user_data:
                 key = user_data[status_key]
                 item_date = None
                 item_display_string = None
@@ -375,16 +375,18 @@ class MAL:
     async def shared_anime(self, ctx, *, args: str = ''):
         settings = parse_arguments(args, default={'style': 'details', 'sort': 'members', 'results': '5', 'reverse': '0', 'min_members': '0'})
         functions = functions_for_style(settings['sort'], 'anime', settings)
-        anime = await sorted_grouped_entities_by(ctx, 'anime', settings, sort_function=functions['sort'])
-        await display_grouped_entities(ctx, anime, settings, details=functions['details'])
+        lists = await shared.cache.require_entity_lists(ctx, 'anime', partial=True)
+        anime = sorted_grouped_entities_by('anime', settings, sort_function=functions['sort'])
+        await display_grouped_entities(ctx, anime, settings, details=functions['details'], lists=lists)
 
     @shared.command(pass_context=True, aliases=['manga'], rest_is_raw=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
     async def shared_manga(self, ctx, *, args: str = ''):
         settings = parse_arguments(args, default={'style': 'details', 'sort': 'members', 'results': '5', 'reverse': '0', 'min_members': '0'})
         functions = functions_for_style(settings['sort'], 'manga', settings)
-        manga = await sorted_grouped_entities_by(ctx, 'manga', settings, sort_function=functions['sort'])
-        await display_grouped_entities(ctx, manga, settings, details=functions['details'])
+        lists = await shared.cache.require_entity_lists(ctx, 'manga', partial=True)
+        manga = sorted_grouped_entities_by('manga', settings, sort_function=functions['sort'])
+        await display_grouped_entities(ctx, manga, settings, details=functions['details'], lists=lists)
 
     @commands.command(pass_context=True, aliases=['nextMAL'])
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
@@ -634,9 +636,10 @@ class MAL:
             user_lookup = utils.UserLookup(ctx.bot)
             message = ''
             data = []
-            for user, list in lists.items():
+            row = shared.cache.affinity_matrix(entity).row(mal_name)
+            for user in lists.keys():
                 if user != mal_name:
-                    items, score = self.get_weighted_score(user_list, list)
+                    items, score = row.get(user, (0, None))
                     data.append({'items': items, 'score': score, 'user': user})
 
             data = sorted(data, key=lambda x: (x.get('score') is not None, x.get('score')), reverse=True)
@@ -662,8 +665,8 @@ class MAL:
 
         items = []
         for user, list in lists.items():
-            mal = make_maluser(user, entity)
-            items.append({'user': user, 'score': mal.mean_score})
+            scored, total_score = columnar.score_summary(list)
+            items.append({'user': user, 'score': total_score / scored if scored > 0 else 0})
 
         items = sorted(items, key=lambda x: x['score'], reverse=True)
         message = ''
@@ -672,17 +675,14 @@ class MAL:
         await utils.safe_say(ctx, message)
 
     def get_weighted_score(self, list1, list2):
-        lookup1 = {}
+        lookup1 = columnar.score_lookup(list1)
+        lookup2 = columnar.score_lookup(list2)
         scores1, scores2 = [], []
 
-        for item in list1:
-            if 'score' in item and item['score'] > 0:
-                lookup1[item['id']] = item
-        for item in list2:
-            if item['id'] in lookup1:
-                if 'score' in item and item['score'] > 0:
-                    scores1.append(lookup1[item['id']]['score'])
-                    scores2.append(item['score'])
+        for mal_id, score in lookup2.items():
+            if mal_id in lookup1:
+                scores1.append(lookup1[mal_id])
+                scores2.append(score)
 
         try:
             if len(scores1) <= 10:
@@ -718,31 +718,32 @@ def pearson(x, y):
     return float(num / den)
 
 def functions_for_style(style, entity, settings):
+    # 'sort' works on the cached title stats [members, completed, score sum, score count], 'details' on the displayed group
     if style == 'members':
-        return {'sort': lambda x: len(x),
+        return {'sort': lambda x: x[0],
                 'details': lambda x: f'{len(x)} members'}
     elif style == 'completed':
         def completed_anime(from_list):
             return len([x for x in from_list if x['entity'][('watched_status' if entity == 'anime' else 'read_status')] == 'completed'])
 
-        return {'sort': lambda x: completed_anime(x),
+        return {'sort': lambda x: x[1],
                 'details': lambda x: f'{completed_anime(x)} members'}
     elif style == 'score':
         try:
             min_members = int(settings['min_members'])
         except:
             min_members = 0
+        dummy_score = 100 if settings['reverse'].lower() in ['1', 'yes', 'true'] else -1
 
         def avg_score(from_list):
             total, score = 0, 0
-            dummy_score = 100 if settings['reverse'].lower() in ['1', 'yes', 'true'] else -1
             for item in from_list:
                 if item['entity']['score'] > 0:
                     total += 1
                     score += item['entity']['score']
             return score / total if total > min_members else dummy_score
 
-        return {'sort': lambda x: avg_score(x),
+        return {'sort': lambda x: x[2] / x[3] if x[3] > min_members else dummy_score,
                 'details': lambda x: '{0:.2f}'.format(avg_score(x))}
     return None
 
@@ -768,9 +769,22 @@ def date_display_string_relative(date):
     difference = format_timedelta(current - datetime.datetime.now(), granularity='days', locale='en_US')
     return f'{difference} ago'
 
-async def display_grouped_entities(ctx, entities, settings, details):
+def partial_notice(lists):
+    notice = ''
+    missing = getattr(lists, 'missing', 0)
+    if missing:
+        plural = 's are' if missing > 1 else ' is'
+        notice += f'\n*Partial results: {missing} list{plural} still loading.*'
+    failed = getattr(lists, 'failed', 0)
+    if failed:
+        plural = 's' if failed > 1 else ''
+        notice += f'\n*{failed} list{plural} could not be loaded.*'
+    return notice
+
+async def display_grouped_entities(ctx, entities, settings, details, lists=None):
     message = ''
     max_size = 2000
+    notice = partial_notice(lists)
 
     try:
         max = int(settings['results'])
@@ -790,36 +804,30 @@ async def display_grouped_entities(ctx, entities, settings, details):
         elif style == 'full':
             members = ', '.join(map(lambda x: user_lookup.display_name_from_mal(x['user']), item))
             part = f"**{item[0]['entity']['title']}**: {members} ({details(item)})\n"
-        if len(message) + len(part) > max_size:
-            await ctx.bot.say(message)
+        if len(message) + len(part) + len(notice) > max_size:
+            await ctx.bot.say(message + notice)
             return
         message += part
-    await ctx.bot.say(message)
+    await ctx.bot.say(message + notice)
 
-async def sorted_grouped_entities_by(ctx, entity, settings, sort_function=None):
-    entities = await build_entity_map(ctx, entity)
+def sorted_grouped_entities_by(entity, settings, sort_function=None):
     should_reverse = settings['reverse'].lower() in ['1', 'yes', 'true']
-    return sorted(entities.values(), reverse=not should_reverse, key=sort_function)
-
-async def build_entity_map(ctx, entity):
-    lists = await shared.cache.require_entity_lists(ctx, entity)
+    try:
+        count = int(settings['results'])
+    except:
+        count = 5
 
-    map_content = {}
-    for user, list in lists.items():
-        for item in list:
-            if item['id'] not in map_content:
-                map_content[item['id']] = []
-            map_content[item['id']].append({'user': user, 'entity': item})
-    return map_content
+    mal_ids = shared.cache.top_titles(entity, sort_function, count, reverse=should_reverse)
+    return [[{'user': user, 'entity': item} for user, item in shared.cache.entries_for_id(entity, mal_id).items()]
+            for mal_id in mal_ids]
 
 def get_entity_avg_score(ctx, data, lists, entity):
     mal_id = data['id']
     nb_scores = 0
     total_score = 0
 
-    for user, list in lists.items():
-        user_data = next((x for x in list if x['id'] == mal_id), None)
-        if user_data:
+    for user, user_data in shared.cache.entries_for_id(entity, mal_id).items():
+        if user in lists:
             if 'score' in user_data and user_data['score'] > 0:
                 nb_scores += 1
                 total_score += user_data['score']
@@ -831,8 +839,9 @@ def build_entity_stats(ctx, data, lists, entity, easter_egg=False):
     mal_id = data['id']
     statuses = {}
     user_lookup = utils.UserLookup(ctx.bot)
+    entries = shared.cache.entries_for_id(entity, mal_id)
 
-    for user, list in lists.items():
+    for user in lists.keys():
         user_display_name = user_lookup.display_name_from_mal(user)
 
         if entity == 'anime':
@@ -842,7 +851,7 @@ def build_entity_stats(ctx, data, lists, entity, easter_egg=False):
             status_key = 'read_status'
             special_statuses = ['reading', 'on-hold', 'dropped']
 
-        user_data = next((x for x in list if x['id'] == mal_id), None)
+        user_data = entries.get(user)
         if easter_egg:
             key = user_data[status_key] if user_data else 'not in list'
             item = f'{user_display_name} (10\*)'
@@ -882,30 +891,35 @@ def build_entity_stats(ctx, data, lists, entity, easter_egg=False):
 
 
 async def api_load_json(ctx, path, toedit=None):
-    with urllib.request.urlopen(f'https://imal.iatgof.com/app.php/2.2/{path}') as url:
-        data = json.loads(url.read().decode())
-        try:
-            if 'error' in data:
-                if toedit:
-                    await ctx.bot.edit_message(toedit, data['error'])
-                else:
-                    await ctx.bot.say(data['error'])
-            else:
-                return data
-        except Exception as e:
-            print(e)
+    try:
+        data = await ctx.bot.http_pool.json(f'https://imal.iatgof.com/app.php/2.2/{path}', timeout=utils.api_timeout)
+        if 'error' in data:
             if toedit:
-                await ctx.bot.edit_message(toedit, 'Could not read data')
+                await ctx.bot.edit_message(toedit, data['error'])
             else:
-                await ctx.bot.say('Could not read data')
+                await ctx.bot.say(data['error'])
+        else:
+            return data
+    except asyncio.TimeoutError:
+        print(f'Timed out loading {path}')
+        if toedit:
+            await ctx.bot.edit_message(toedit, 'MAL took too long to answer, try again later')
+        else:
+            await ctx.bot.say('MAL took too long to answer, try again later')
+    except Exception as e:
+        print(e)
+        if toedit:
+            await ctx.bot.edit_message(toedit, 'Could not read data')
+        else:
+            await ctx.bot.say('Could not read data')
     return None
 
 
 def make_maluser(mal_name, entity: str):
     if entity == 'anime':
-        return MALUserAnime(mal_name)
+        return shared.cache.user_stats(mal_name, entity, MALUserAnime)
     elif entity == 'manga':
-        return MALUserManga(mal_name)
+        return shared.cache.user_stats(mal_name, entity, MALUserManga)
     return None
 
 class MALUser:
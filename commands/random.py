@@ -4,7 +4,6 @@ import asyncio
 import datetime
 import discord
 import json
-import aiohttp
 import tempfile
 import subprocess, os
 import random
@@ -65,14 +64,12 @@ class Random:
     @commands.command(pass_context=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
     async def quote(self, ctx):
-        async with aiohttp.ClientSession() as session:
-            async with session.get('http://inspirobot.me/api?generate=true') as response:
-                url = await response.text()
-
-                message = discord.Embed()
-                message.colour = random.randrange(0, 0xFFFFFF)
-                message.set_image(url=url)
-                await ctx.bot.say(embed=message)
+        url = await ctx.bot.http_pool.text('http://inspirobot.me/api?generate=true')
+
+        message = discord.Embed()
+        message.colour = random.randrange(0, 0xFFFFFF)
+        message.set_image(url=url)
+        await ctx.bot.say(embed=message)
 
     @commands.command(pass_context=True, rest_is_raw=True)
     @checks.is_banned(permission=checks.PermissionLevel.Unsafe)
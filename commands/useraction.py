@@ -33,19 +33,19 @@ class UserAction:
         if member is None:
             member = ctx.message.author
 
-        session = database.new_session()
-        user = session.query(database.User).filter(database.User.discord_id == member.id).first()
+        with database.session_scope() as session:
+            user = session.query(database.User).filter(database.User.discord_id == member.id).first()
 
-        if user is None:
-            await ctx.bot.say(f'No data recorded for {member.name}')
-            return
+            if user is None:
+                await ctx.bot.say(f'No data recorded for {member.name}')
+                return
 
-        if not show_extra or show_extra.startswith('+'):
-            await ctx.bot.say(embed=self.profile_main_message(ctx, user, member, session, show_extra))
-        if show_extra:
-            message = self.profile_extra_message(ctx, session, user, member)
-            if message:
-                await utils.force_say(message, ctx.bot.say)
+            if not show_extra or show_extra.startswith('+'):
+                await ctx.bot.say(embed=self.profile_main_message(ctx, user, member, session, show_extra))
+            if show_extra:
+                message = self.profile_extra_message(ctx, session, user, member)
+                if message:
+                    await utils.force_say(message, ctx.bot.say)
 
     def profile_main_message(self, ctx, user, member, session, show_extra):
         true_name = utils.UserLookup.display_name_with_context(ctx, member)
@@ -55,7 +55,7 @@ class UserAction:
         message = discord.Embed(title=title, url=url)
 
         if user.mal_name:
-            picture = utils.silent_picture_grab(user.mal_name)
+            picture = shared.avatars.get(user.mal_name)
             if picture:
                 message.set_thumbnail(url=picture)
 
@@ -131,119 +131,119 @@ class UserAction:
         member = await utils.convert_member(ctx, member_raw, optional=True)
         if member is None:
             user_lookup = utils.UserLookup(ctx.bot)
-            session = database.new_session()
-            users = session.query(database.User).filter(database.User.timezone.isnot(None)).all()
-
-            timezones = {}
-            now = datetime.datetime.utcnow()
-            for user in users:
-                local_time = pytz.utc.localize(now, is_dst=None).astimezone(pytz.timezone(user.timezone))
-                key = local_time.strftime('%Y%m%d %H:%M:%S')
-                if key in timezones:
-                    timezones[key]['data'].append(user)
-                else:
-                    timezones[key] = {'tz': local_time, 'data': [user]}
+            with database.session_scope() as session:
+                users = session.query(database.User).filter(database.User.timezone.isnot(None)).all()
+
+                timezones = {}
+                now = datetime.datetime.utcnow()
+                for user in users:
+                    local_time = pytz.utc.localize(now, is_dst=None).astimezone(pytz.timezone(user.timezone))
+                    key = local_time.strftime('%Y%m%d %H:%M:%S')
+                    if key in timezones:
+                        timezones[key]['data'].append(user)
+                    else:
+                        timezones[key] = {'tz': local_time, 'data': [user]}
 
-            days_tz = {}
-            for key in timezones.keys():
-                day_string = key.split(' ')[0]
-                if day_string not in days_tz:
-                    days_tz[day_string] = []
-                days_tz[day_string].append({'sorting': key, 'time': timezones[key]['tz'], 'users': timezones[key]['data']})
+                days_tz = {}
+                for key in timezones.keys():
+                    day_string = key.split(' ')[0]
+                    if day_string not in days_tz:
+                        days_tz[day_string] = []
+                    days_tz[day_string].append({'sorting': key, 'time': timezones[key]['tz'], 'users': timezones[key]['data']})
 
-            sorted_tz = {k: sorted(v, key=lambda x: x['sorting']) for k, v in days_tz.items()}
+                sorted_tz = {k: sorted(v, key=lambda x: x['sorting']) for k, v in days_tz.items()}
 
-            flat_tz = []
-            for item in sorted_tz.keys():
-                flat_tz.append({'day': item, 'data': sorted_tz[item]})
+                flat_tz = []
+                for item in sorted_tz.keys():
+                    flat_tz.append({'day': item, 'data': sorted_tz[item]})
 
-            final_tz = sorted(flat_tz, key=lambda x: x['day'])
+                final_tz = sorted(flat_tz, key=lambda x: x['day'])
 
-            message = ''
-            for day in final_tz:
-                day_string = day['data'][0]['time'].strftime('%A')
-                message += f'**{day_string}:**\n\n'
-                for item in day['data']:
-                    display_time = item['time'].strftime('%H:%M:%S')
-                    tz_users = ', '.join(map(lambda x: f'{user_lookup.display_name_from_mal(x.mal_name)} *({x.timezone})*', item['users']))
-                    message += f'{display_time}:\n{tz_users}\n\n'
-            await utils.safe_say(ctx, message)
+                message = ''
+                for day in final_tz:
+                    day_string = day['data'][0]['time'].strftime('%A')
+                    message += f'**{day_string}:**\n\n'
+                    for item in day['data']:
+                        display_time = item['time'].strftime('%H:%M:%S')
+                        tz_users = ', '.join(map(lambda x: f'{user_lookup.display_name_from_mal(x.mal_name)} *({x.timezone})*', item['users']))
+                        message += f'{display_time}:\n{tz_users}\n\n'
+                await utils.safe_say(ctx, message)
 
         else:
-            session = database.new_session()
-            user = session.query(database.User).filter(database.User.discord_id == member.id).first()
+            with database.session_scope() as session:
+                user = session.query(database.User).filter(database.User.discord_id == member.id).first()
 
-            if user is None or user.timezone is None:
-                await ctx.bot.say(f'{utils.UserLookup.display_name_from_user(member)} has not set their timezone!')
-                return
+                if user is None or user.timezone is None:
+                    await ctx.bot.say(f'{utils.UserLookup.display_name_from_user(member)} has not set their timezone!')
+                    return
 
-            tz = pytz.timezone(user.timezone)
-            time = pytz.utc.localize(datetime.datetime.utcnow(), is_dst=None).astimezone(tz)
-            timezone_string = time.strftime('%A %H:%M:%S')
-            await ctx.bot.say(f'{timezone_string} ({user.timezone})\n')
+                tz = pytz.timezone(user.timezone)
+                time = pytz.utc.localize(datetime.datetime.utcnow(), is_dst=None).astimezone(tz)
+                timezone_string = time.strftime('%A %H:%M:%S')
+                await ctx.bot.say(f'{timezone_string} ({user.timezone})\n')
 
     @commands.command(pass_context=True, aliases=['Users'])
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
     async def users(self, ctx, extras: str = None):
-        session = database.new_session()
-        users = session.query(database.User).all()
+        with database.session_scope() as session:
+            users = session.query(database.User).all()
 
-        lookup = {}
-        for user in users:
-            lookup[user.discord_id] = user
-
-        registered_users_raw = []
-        registered_users = []
-        new_users = []
-        mal_users = lookup
-
-        server_id = ctx.message.server.id if ctx.message.server and ctx.message.server.id else shared.main_server_id
-        server = ctx.bot.get_server(server_id)
-        for member in server.members:
-            if not member.bot:
-                true_name = utils.UserLookup.display_name_from_user(member)
-                if member.id in lookup:
-                    if true_name == lookup[member.id].mal_name:
-                        registered_users.append(true_name)
+            lookup = {}
+            for user in users:
+                lookup[user.discord_id] = user
+
+            registered_users_raw = []
+            registered_users = []
+            new_users = []
+            mal_users = lookup
+
+            server_id = ctx.message.server.id if ctx.message.server and ctx.message.server.id else shared.main_server_id
+            server = ctx.bot.get_server(server_id)
+            for member in server.members:
+                if not member.bot:
+                    true_name = utils.UserLookup.display_name_from_user(member)
+                    if member.id in lookup:
+                        if true_name == lookup[member.id].mal_name:
+                            registered_users.append(true_name)
+                        else:
+                            registered_users.append(f'{true_name} *({lookup[member.id].mal_name})*')
+                        registered_users_raw.append(member)
+                        mal_users.pop(member.id)
                     else:
-                        registered_users.append(f'{true_name} *({lookup[member.id].mal_name})*')
-                    registered_users_raw.append(member)
-                    mal_users.pop(member.id)
-                else:
-                    new_users.append(true_name)
+                        new_users.append(true_name)
+
+            message = ''
+            if registered_users:
+                message += '**Registered users**:\n'
+                message += ', '.join(registered_users)
+                message += '\n\n'
+            if new_users:
+                message += '**Users who have not filled their profile yet** (type `!user setup`):\n'
+                message += ', '.join(new_users)
+                message += '\n\n'
+            if mal_users:
+                message += '**Registered users who are not in this server**:\n'
+                message += ', '.join(map(lambda x: x.mal_name, mal_users.values()))
+                message += '\n\n'
+
+            if extras and extras in ['extra', 'extras']:
+                message += 'Registered users with an extras profile:\n'
+
+                user_extras = session.query(database.UserExtras).all()
+                extras_lookup = {}
+                for item in user_extras:
+                    extras_lookup[item.user_id] = item
+
+                user_extra_profile = []
+                for user in registered_users_raw:
+                    if lookup[user.id].id in extras_lookup:
+                        user_extra_profile.append(utils.UserLookup.display_name_from_user(user))
+
+                message += ', '.join(user_extra_profile)
+                message += '\n\n'
 
-        message = ''
-        if registered_users:
-            message += '**Registered users**:\n'
-            message += ', '.join(registered_users)
-            message += '\n\n'
-        if new_users:
-            message += '**Users who have not filled their profile yet** (type `!user setup`):\n'
-            message += ', '.join(new_users)
-            message += '\n\n'
-        if mal_users:
-            message += '**Registered users who are not in this server**:\n'
-            message += ', '.join(map(lambda x: x.mal_name, mal_users.values()))
-            message += '\n\n'
-
-        if extras and extras in ['extra', 'extras']:
-            message += 'Registered users with an extras profile:\n'
-
-            user_extras = session.query(database.UserExtras).all()
-            extras_lookup = {}
-            for item in user_extras:
-                extras_lookup[item.user_id] = item
-
-            user_extra_profile = []
-            for user in registered_users_raw:
-                if lookup[user.id].id in extras_lookup:
-                    user_extra_profile.append(utils.UserLookup.display_name_from_user(user))
-
-            message += ', '.join(user_extra_profile)
-            message += '\n\n'
-
-
-        await utils.safe_say(ctx, message)
+
+            await utils.safe_say(ctx, message)
 
     @commands.command(pass_context=True, aliases=['Projects', 'Project', 'project'], rest_is_raw=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
@@ -251,24 +251,24 @@ class UserAction:
         user_lookup = utils.UserLookup(ctx.bot)
 
         if not project_name:
-            session = database.new_session()
-            projects = sorted(session.query(database.Project).all(), key=lambda proj: proj.name)
-            users = session.query(database.User).all()
-
-            lookup = {}
-            for user in users:
-                for p in user.projects:
-                    if p.id not in lookup:
-                        lookup[p.id] = []
-                    if user.mal_name:
-                        lookup[p.id].append(user_lookup.display_name_from_mal(user.mal_name))
-
-            message = '\n'.join(map(lambda x: self.project_string(x, lookup), projects))
-            await utils.safe_say(ctx, f'Use `!project [project_name]` to get details about a project.\n\n{message}')
+            with database.session_scope() as session:
+                projects = sorted(session.query(database.Project).all(), key=lambda proj: proj.name)
+                users = session.query(database.User).all()
+
+                lookup = {}
+                for user in users:
+                    for p in user.projects:
+                        if p.id not in lookup:
+                            lookup[p.id] = []
+                        if user.mal_name:
+                            lookup[p.id].append(user_lookup.display_name_from_mal(user.mal_name))
+
+                message = '\n'.join(map(lambda x: self.project_string(x, lookup), projects))
+                await utils.safe_say(ctx, f'Use `!project [project_name]` to get details about a project.\n\n{message}')
         else:
             project_name = project_name.strip()
-            session = database.new_session()
-            await ctx.bot.say(self.project_build_message(ctx, session, user_lookup, project_name))
+            with database.session_scope() as session:
+                await ctx.bot.say(self.project_build_message(ctx, session, user_lookup, project_name))
 
     def project_string(self, project, users_lookup):
         if project.id in users_lookup:
@@ -512,43 +512,43 @@ class UserAction:
                                   formatted_group_name=lambda item, _: item)
 
     def util_list_all(self, wants_stat_grouping, wants_grouping_detail, valid_user_check, get_grouping_properties, get_display_string, sorting, formatted_group_name):
-        session = database.new_session()
-        users = session.query(database.User).all()
-
-        items_lookup = {}
-        for user in users:
-            if valid_user_check(user) and user.mal_name:
-                properties = get_grouping_properties(user)
-                for meta, property in properties:
-                    if property in items_lookup:
-                        items_lookup[property].append((user, meta))
-                    else:
-                        items_lookup[property] = [(user, meta)]
+        with database.session_scope() as session:
+            users = session.query(database.User).all()
 
-        sorted_items = sorting(items_lookup) if sorting else sorted(items_lookup.keys())
-        message = ''
-        for item in sorted_items:
-            if wants_grouping_detail:
-                message += f'`{formatted_group_name(item, items_lookup[item])}: `'
-            else:
-                message += f'**{formatted_group_name(item, items_lookup[item])}**: '
-            n = len(items_lookup[item])
-            if wants_stat_grouping:
+            items_lookup = {}
+            for user in users:
+                if valid_user_check(user) and user.mal_name:
+                    properties = get_grouping_properties(user)
+                    for meta, property in properties:
+                        if property in items_lookup:
+                            items_lookup[property].append((user, meta))
+                        else:
+                            items_lookup[property] = [(user, meta)]
+
+            sorted_items = sorting(items_lookup) if sorting else sorted(items_lookup.keys())
+            message = ''
+            for item in sorted_items:
                 if wants_grouping_detail:
-                    message += f' **{n}**'
+                    message += f'`{formatted_group_name(item, items_lookup[item])}: `'
                 else:
-                    message += f' {n}'
+                    message += f'**{formatted_group_name(item, items_lookup[item])}**: '
+                n = len(items_lookup[item])
+                if wants_stat_grouping:
+                    if wants_grouping_detail:
+                        message += f' **{n}**'
+                    else:
+                        message += f' {n}'
 
-            names = ', '.join(map(lambda x: get_display_string(x[0], x[1]), items_lookup[item]))
-            if wants_stat_grouping:
-                if wants_grouping_detail:
-                    message += f' *({names})*'
-            else:
-                message += f'{names}'
+                names = ', '.join(map(lambda x: get_display_string(x[0], x[1]), items_lookup[item]))
+                if wants_stat_grouping:
+                    if wants_grouping_detail:
+                        message += f' *({names})*'
+                else:
+                    message += f'{names}'
 
-            message += '\n'
+                message += '\n'
 
-        return message
+            return message
 
     async def entity_stats(self, ctx, user_lookup, subcommand, entity):
         if not subcommand:
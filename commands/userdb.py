@@ -82,48 +82,48 @@ class Userdb:
         try:
             user_id = ctx.message.author.id
 
-            session = database.new_session()
-            user = session.query(database.User).filter(database.User.discord_id == user_id).first()
-            if user is None:
-                await ctx.bot.whisper(f'Hello {ctx.message.author.name}, your profile doesn\'t exist yet. Please run `!user setup` to get started!')
-                return
+            with database.session_scope() as session:
+                user = session.query(database.User).filter(database.User.discord_id == user_id).first()
+                if user is None:
+                    await ctx.bot.whisper(f'Hello {ctx.message.author.name}, your profile doesn\'t exist yet. Please run `!user setup` to get started!')
+                    return
 
-            fields = ', '.join(map(lambda x: f'`{x}`', self.questions.keys()))
-            fields += 'and `projects`'
-            dm = await ctx.bot.whisper(f'Hello {ctx.message.author.name}, You can edit any of the following fields (just type its name, or `done` to stop updating your profile):\n{fields}')
-            data = {
-                'ctx': ctx,
-                'user': ctx.message.author,
-                'channel': dm.channel,
-            }
+                fields = ', '.join(map(lambda x: f'`{x}`', self.questions.keys()))
+                fields += 'and `projects`'
+                dm = await ctx.bot.whisper(f'Hello {ctx.message.author.name}, You can edit any of the following fields (just type its name, or `done` to stop updating your profile):\n{fields}')
+                data = {
+                    'ctx': ctx,
+                    'user': ctx.message.author,
+                    'channel': dm.channel,
+                }
 
-            while True:
-                response = await self.db_wait_message(data)
-                response = response.lower()
+                while True:
+                    response = await self.db_wait_message(data)
+                    response = response.lower()
 
-                if response == 'done':
-                    break
+                    if response == 'done':
+                        break
 
-                elif response in ['mal_name', 'gender', 'bio']:
-                    setattr(user, response, await self.db_ask(data, response))
-                    session.commit()
-                elif response in ['birthdate']:
-                    setattr(user, response, await self.db_ask_date(data, response))
-                    session.commit()
-                elif response == 'country':
-                    await self.db_fill_country(ctx, data, session, user)
-                elif response == 'timezone':
-                    await self.db_fill_tz(ctx, data, session, user)
-                elif response == 'languages':
-                    await self.db_fill_languages(ctx, data, session, user)
-                elif response == 'prog_languages':
-                    await self.db_fill_prog_languages(ctx, data, session, user)
-                elif response == 'projects':
-                    await self.update_projects(ctx, data, session, user)
-
-                await ctx.bot.whisper( f'You can edit any of the following fields (just type its name, or `done` to stop updating your profile):\n{fields}')
-
-            await ctx.bot.whisper(f'Thank you!')
+                    elif response in ['mal_name', 'gender', 'bio']:
+                        setattr(user, response, await self.db_ask(data, response))
+                        session.commit()
+                    elif response in ['birthdate']:
+                        setattr(user, response, await self.db_ask_date(data, response))
+                        session.commit()
+                    elif response == 'country':
+                        await self.db_fill_country(ctx, data, session, user)
+                    elif response == 'timezone':
+                        await self.db_fill_tz(ctx, data, session, user)
+                    elif response == 'languages':
+                        await self.db_fill_languages(ctx, data, session, user)
+                    elif response == 'prog_languages':
+                        await self.db_fill_prog_languages(ctx, data, session, user)
+                    elif response == 'projects':
+                        await self.update_projects(ctx, data, session, user)
+
+                    await ctx.bot.whisper( f'You can edit any of the following fields (just type its name, or `done` to stop updating your profile):\n{fields}')
+
+                await ctx.bot.whisper(f'Thank you!')
         finally:
             shared.state.unlock(ctx)
 
@@ -135,50 +135,50 @@ class Userdb:
     @checks.is_banned(permission=checks.PermissionLevel.UserData)
     async def db_setup(self, ctx, arg = None):
 
-        session = database.new_session()
-        user_id = ctx.message.author.id
-        user = session.query(database.User).filter(database.User.discord_id == user_id).first()
+        with database.session_scope() as session:
+            user_id = ctx.message.author.id
+            user = session.query(database.User).filter(database.User.discord_id == user_id).first()
 
-        if user is not None and arg != 'force':
-            await ctx.bot.whisper(f"""You already have a profile, did you mean to edit it using `!user update`?
+            if user is not None and arg != 'force':
+                await ctx.bot.whisper(f"""You already have a profile, did you mean to edit it using `!user update`?
 If you want to go through the setup again, use `!user setup force`""")
-            return
+                return
 
-        await shared.state.lock_user(ctx, '!user setup')
-        try:
-            dm = await ctx.bot.whisper(f"""Hello {ctx.message.author.name}, let's get started!
+            await shared.state.lock_user(ctx, '!user setup')
+            try:
+                dm = await ctx.bot.whisper(f"""Hello {ctx.message.author.name}, let's get started!
 I'm going to ask a few questions so we can get to know you. This is just to get a general idea of who you are, it's not for the NSA, I swear.
 If you don't want to answer one of these question, just type `-` and I'll ignore it or put some default value if needed.
 You can edit this later using `!user update`.""")
 
-            data = {
-                'ctx': ctx,
-                'user': ctx.message.author,
-                'channel': dm.channel,
-            }
+                data = {
+                    'ctx': ctx,
+                    'user': ctx.message.author,
+                    'channel': dm.channel,
+                }
 
 
-            if user is None:
-                user = database.User(discord_id=user_id)
-                session.add(user)
+                if user is None:
+                    user = database.User(discord_id=user_id)
+                    session.add(user)
 
-            user.mal_name = await self.db_ask(data, 'mal_name')
-            session.commit()
-            user.birthdate = await self.db_ask_date(data, 'birthdate')
-            session.commit()
-            user.gender = await self.db_ask(data, 'gender')
-            session.commit()
+                user.mal_name = await self.db_ask(data, 'mal_name')
+                session.commit()
+                user.birthdate = await self.db_ask_date(data, 'birthdate')
+                session.commit()
+                user.gender = await self.db_ask(data, 'gender')
+                session.commit()
 
-            await self.db_fill_country(ctx, data, session, user)
-            await self.db_fill_tz(ctx, data, session, user)
-            await self.db_fill_languages(ctx, data, session, user)
-            await self.db_fill_prog_languages(ctx, data, session, user)
-            user.bio = await self.db_ask(data, 'bio')
-            session.commit()
-            await self.update_projects(ctx, data, session, user)
+                await self.db_fill_country(ctx, data, session, user)
+                await self.db_fill_tz(ctx, data, session, user)
+                await self.db_fill_languages(ctx, data, session, user)
+                await self.db_fill_prog_languages(ctx, data, session, user)
+                user.bio = await self.db_ask(data, 'bio')
+                session.commit()
+                await self.update_projects(ctx, data, session, user)
 
-            session.commit()
-            await ctx.bot.whisper(f"""That's all for now, thank you!
+                session.commit()
+                await ctx.bot.whisper(f"""That's all for now, thank you!
 You can see your profile or other people's profile by using `!profile [user]`
 
 If you still want to tell us about you, here are some additional commands you can run:
@@ -191,8 +191,8 @@ Lastly, keep an eye on the channels under ELECTIONS, we run very important waifu
 Also, please avoid using `@everyone` or `@here` unless it's a real emergency.
 Instead, you should use `@AMA` if you have a question or need some help.""")
 
-        finally:
-            shared.state.unlock(ctx)
+            finally:
+                shared.state.unlock(ctx)
 
     async def update_projects(self, ctx, data, session, user):
         while True:
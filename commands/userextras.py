@@ -42,27 +42,27 @@ class UserdbExtras:
         await shared.state.lock_user(ctx, '!user extras update')
 
         try:
-            session = database.new_session()
-            user = await self.get_user(ctx, session, ctx.message.author.id)
+            with database.session_scope() as session:
+                user = await self.get_user(ctx, session, ctx.message.author.id)
 
-            extras = session.query(database.Extras).all()
-            user_extras = session.query(database.UserExtras).filter(database.UserExtras.user_id == user.id).all()
+                extras = session.query(database.Extras).all()
+                user_extras = session.query(database.UserExtras).filter(database.UserExtras.user_id == user.id).all()
 
-            if len(extras) == 0:
-                await ctx.bot.whisper('No extras available')
-                return
+                if len(extras) == 0:
+                    await ctx.bot.whisper('No extras available')
+                    return
 
-            done_extras, new_extras = self.sort_extras(extras, user_extras)
+                done_extras, new_extras = self.sort_extras(extras, user_extras)
 
-            done_extras_display = '\n'.join(map(lambda x: f'**{x["extra"].id}** - {x["extra"].question}', done_extras))
-            new_extras_display = '\n'.join(map(lambda x: f'**{x.id}** - {x.question}', new_extras))
+                done_extras_display = '\n'.join(map(lambda x: f'**{x["extra"].id}** - {x["extra"].question}', done_extras))
+                new_extras_display = '\n'.join(map(lambda x: f'**{x.id}** - {x.question}', new_extras))
 
-            if not done_extras_display:
-                done_extras_display = 'None'
-            if not new_extras_display:
-                new_extras_display = 'None'
+                if not done_extras_display:
+                    done_extras_display = 'None'
+                if not new_extras_display:
+                    new_extras_display = 'None'
 
-            message = f"""To answer a question, simply type its identifier.
+                message = f"""To answer a question, simply type its identifier.
 If you do not want to answer a question, simply type `-` and I will skip it (and remove your previous answer if any).
 If at any point you want to stop editing questions, type `!quit` (or `done` when selecting questions).
 Questions you've already answered:
@@ -71,16 +71,16 @@ Questions you've already answered:
 New questions:
 {new_extras_display}"""
 
-            dm = await utils.force_say(message, ctx.bot.whisper)
+                dm = await utils.force_say(message, ctx.bot.whisper)
 
-            data = {
-                'ctx': ctx,
-                'user': ctx.message.author,
-                'channel': dm.channel,
-            }
+                data = {
+                    'ctx': ctx,
+                    'user': ctx.message.author,
+                    'channel': dm.channel,
+                }
 
-            while True:
-                done_extras, new_extras = await self.db_update_loop(ctx, data, session, user, done_extras, new_extras)
+                while True:
+                    done_extras, new_extras = await self.db_update_loop(ctx, data, session, user, done_extras, new_extras)
         finally:
             shared.state.unlock(ctx)
 
@@ -124,38 +124,38 @@ New questions:
         await shared.state.lock_user(ctx, '!user extras setup')
 
         try:
-            session = database.new_session()
-            user = await self.get_user(ctx, session, ctx.message.author.id)
+            with database.session_scope() as session:
+                user = await self.get_user(ctx, session, ctx.message.author.id)
 
-            extras = session.query(database.Extras).all()
-            user_extras = session.query(database.UserExtras).filter(database.UserExtras.user_id == user.id).all()
+                extras = session.query(database.Extras).all()
+                user_extras = session.query(database.UserExtras).filter(database.UserExtras.user_id == user.id).all()
 
-            if len(extras) == 0:
-                await ctx.bot.whisper('No extras available')
-                return
+                if len(extras) == 0:
+                    await ctx.bot.whisper('No extras available')
+                    return
 
-            done_extras, new_extras = self.sort_extras(extras, user_extras)
+                done_extras, new_extras = self.sort_extras(extras, user_extras)
 
-            if len(new_extras) == 0:
-                await ctx.bot.whisper('You\'ve already answered all extra questions. To edit them, use `!extras update`.')
-                return
+                if len(new_extras) == 0:
+                    await ctx.bot.whisper('You\'ve already answered all extra questions. To edit them, use `!extras update`.')
+                    return
 
-            dm = await ctx.bot.whisper("""I will now ask you some random questions.
+                dm = await ctx.bot.whisper("""I will now ask you some random questions.
 If you do not want to answer a question, simply type `-` and I will skip it.
 If possible answers are specified, you can only use one of them. Otherwise, you're free to write what you want.
 If at any point you want to stop answering these questions, type `!quit`.
 """)
 
-            data = {
-                'ctx': ctx,
-                'user': ctx.message.author,
-                'channel': dm.channel,
-            }
+                data = {
+                    'ctx': ctx,
+                    'user': ctx.message.author,
+                    'channel': dm.channel,
+                }
 
-            for item in new_extras:
-                await self.ask_extra(data, session, user, item)
+                for item in new_extras:
+                    await self.ask_extra(data, session, user, item)
 
-            await ctx.bot.whisper('Annnnnnd done! Thank you! You can use `!profile extras [user]` to view other people\'s answers.')
+                await ctx.bot.whisper('Annnnnnd done! Thank you! You can use `!profile extras [user]` to view other people\'s answers.')
         finally:
             shared.state.unlock(ctx)
 
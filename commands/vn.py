@@ -14,19 +14,31 @@ class VisualNovel:
     def __init__(self, bot):
         self.bot = bot
         self.vndb_connect = None
-        self.vndb_static = vndb.VNDBStatic()
+        self.vndb_cache = vndb.QueryCache()
+        self.vndb_static = vndb.VNDBStatic(bot.http_pool)
 
-    def vndb_instance(self, force=False):
-        if force or not self.vndb_connect:
-            self.vndb_connect = vndb.VNDB(username='iatgof-andre', password='andre')
+    def __unload(self):
+        if self.vndb_connect:
+            asyncio.ensure_future(self.vndb_connect.close())
+
+    def vndb_instance(self):
+        if not self.vndb_connect:
+            self.vndb_connect = vndb.VNDB(username='iatgof-andre', password='andre', cache=self.vndb_cache)
         return self.vndb_connect
 
-    def vndb_get(self, item, fields, filters, pre_filtered=False):
+    async def vndb_get(self, item, fields, filters, pre_filtered=False):
         filters = self.filter_from_user_string(filters) if not pre_filtered else filters
         try:
-            return self.vndb_instance().get(item, fields, filters, '')
-        except:
-            return self.vndb_instance(force=True).get(item, fields, filters, '')
+            return await self.vndb_instance().get(item, fields, filters, '')
+        except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            # The client reconnects by itself on the next command
+            return await self.vndb_instance().get(item, fields, filters, '')
+
+    async def vndb_get_ids(self, item, fields, ids):
+        try:
+            return await self.vndb_instance().getByIds(item, fields, ids)
+        except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return await self.vndb_instance().getByIds(item, fields, ids)
 
     def replace_alias(self, name):
         return self.vndb_static.aliases.get(name.lower(), name)
@@ -96,7 +108,7 @@ Examples: ```
         if options['related']:
             query += ',relations'
 
-        items = self.vndb_get('vn', query, name)
+        items = await self.vndb_get('vn', query, name)
         if items['items']:
             item = items['items'][0]
             await self.display_vn(ctx, item, options=options)
@@ -106,7 +118,7 @@ Examples: ```
     @commands.command(pass_context=True, aliases=['VNSearch', 'vns'], rest_is_raw=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
     async def vnsearch(self, ctx, *, name):
-        items = self.vndb_get('vn', 'basic', name)
+        items = await self.vndb_get('vn', 'basic', name)
         message = '\n'.join(map(lambda x: f'`{x["id"]}`: {x["title"]}', items['items']))
 
         await ctx.bot.say(message)
@@ -116,7 +128,7 @@ Examples: ```
     async def vntags(self, ctx, *, name):
         name, options = self.extract_options(name)
 
-        items = self.vndb_get('vn', 'basic,details,tags', name)
+        items = await self.vndb_get('vn', 'basic,details,tags', name)
         if items['items']:
             item = items['items'][0]
             await self.display_vn_tags(ctx, item, options=options)
@@ -134,7 +146,7 @@ Examples: ```
         if options['vns']:
             query += ',vns'
 
-        items = self.vndb_get('character', query, name)
+        items = await self.vndb_get('character', query, name)
         if items['items']:
             item = items['items'][0]
             await self.display_vn_character(ctx, item, options=options)
@@ -144,7 +156,7 @@ Examples: ```
     @commands.command(pass_context=True, aliases=['VNCharacterSearch', 'vncs', 'vnsc'], rest_is_raw=True)
     @checks.is_banned(permission=checks.PermissionLevel.Safe)
     async def vncharactersearch(self, ctx, *, name):
-        items = self.vndb_get('character', 'basic', name)
+        items = await self.vndb_get('character', 'basic', name)
         message = '\n'.join(map(lambda x: f'`{x["id"]}`: {x["name"]}', items['items']))
 
         await ctx.bot.say(message)
@@ -154,7 +166,7 @@ Examples: ```
     async def vncharactertraits(self, ctx, *, name):
         name, options = self.extract_options(name)
 
-        items = self.vndb_get('character', 'basic,details,traits', name)
+        items = await self.vndb_get('character', 'basic,details,traits', name)
         if items['items']:
             item = items['items'][0]
             await self.display_vn_character_traits(ctx, item, options=options)
@@ -249,10 +261,11 @@ Examples: ```
 
         if options['vns'] and chara.get('vns', None):
             description += '\n**VNs**:\n'
-            for item in chara['vns']:
-                if options['spoil'] or item[2] == 0:
-                    vndata = self.vndb_get('vn', 'basic', f'(id={item[0]})', pre_filtered=True)
-                    description += f'{vndata["items"][0]["title"]} ({item[3]})\n'
+            shown = [item for item in chara['vns'] if options['spoil'] or item[2] == 0]
+            vns = await self.vndb_get_ids('vn', 'basic', [item[0] for item in shown])
+            for item in shown:
+                if item[0] in vns:
+                    description += f'{vns[item[0]]["title"]} ({item[3]})\n'
 
         if options['traits']:
             traits = await self.get_display_traits(chara, options)
@@ -280,21 +293,7 @@ Examples: ```
                 if options['spoil'] or trait[1] == 0:
                     data = traits_data.get(str(trait[0]), None)
                     if data:
-                        def deep_parent_list(item):
-                            queue = [item]
-                            output = set()
-                            while queue:
-                                data = traits_data.get(queue[0], None)
-                                if data:
-                                    if data['parents']:
-                                        queue.extend(data['parents'])
-                                    else:
-                                        output.add(queue[0])
-                                queue.pop(0)
-                            return list(output)
-
-                        main_parents = deep_parent_list(str(trait[0]))
-                        for parent in main_parents:
+                        for parent in data['roots']:
                             if parent not in raw_table:
                                 raw_table[parent] = []
                             raw_table[parent].append(str(trait[0]))
@@ -350,6 +349,16 @@ Examples: ```
             message += f'**{alias}**: {name}\n'
         await ctx.bot.say(message)
 
+    @commands.command(pass_context=True, hidden=True)
+    @checks.is_owner()
+    async def vndbstats(self, ctx):
+        stats = self.vndb_cache.statistics()
+        message = f'Cached queries: {stats["entries"]}/{self.vndb_cache.max_entries}\n'
+        message += 'Hits: {} / Misses: {} ({:.1f}% hit rate)\n'.format(stats['hits'], stats['misses'], stats['hit_rate'] * 100)
+        connected = self.vndb_connect is not None and self.vndb_connect.connected
+        message += f'Connection: {"open" if connected else "closed"}'
+        await ctx.bot.say(message)
+
     ### API
 
     @commands.command(pass_context=True)
@@ -357,7 +366,7 @@ Examples: ```
         success = False
         try:
             if identifier.isdigit():
-                items = self.vndb_get('character', 'basic,details,vns', f'(id={identifier})', pre_filtered=True)
+                items = await self.vndb_get('character', 'basic,details,vns', f'(id={identifier})', pre_filtered=True)
                 if items['items']:
                     chara = items['items'][0]
                     output = {}
@@ -369,10 +378,11 @@ Examples: ```
 
                     output['vns'] = []
                     if chara.get('vns', None):
-                        for item in chara['vns']:
-                            if item[2] == 0:
-                                vndata = self.vndb_get('vn', 'basic', f'(id={item[0]})', pre_filtered=True)
-                                output['vns'].append({'id': item[0], 'name': vndata["items"][0]["title"], 'role': item[3]})
+                        shown = [item for item in chara['vns'] if item[2] == 0]
+                        vns = await self.vndb_get_ids('vn', 'basic', [item[0] for item in shown])
+                        for item in shown:
+                            if item[0] in vns:
+                                output['vns'].append({'id': item[0], 'name': vns[item[0]]['title'], 'role': item[3]})
 
                     message = f'```{json.dumps(output)}```'
                     await ctx.bot.say(message)
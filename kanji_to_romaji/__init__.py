@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 from .kanji_to_romaji_module import convert_hiragana_to_katakana, translate_to_romaji, translate_soukon, \
-    translate_long_vowel, translate_soukon_ch, kanji_to_romaji
+    translate_long_vowel, translate_soukon_ch, kanji_to_romaji, compile_kanji_mappings, load_mappings, \
+    warm_mappings
+from .romaji_cache import RomajiCache, romanize_blocks
 __all__ = ["load_mappings_dict", "convert_hiragana_to_katakana", "convert_katakana_to_hiragana",
            "translate_to_romaji", "translate_soukon",
-           "translate_long_vowel", "translate_soukon_ch", "kanji_to_romaji"]
+           "translate_long_vowel", "translate_soukon_ch", "kanji_to_romaji", "compile_kanji_mappings", "load_mappings", "warm_mappings",
+           "RomajiCache", "romanize_blocks"]
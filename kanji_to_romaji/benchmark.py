@@ -0,0 +1,44 @@
+# coding=utf-8
+"""
+time kanji_to_romaji on long paragraphs
+usage: python -m kanji_to_romaji.benchmark [repeat]
+"""
+from __future__ import print_function
+import sys
+import time
+
+from kanji_to_romaji.kanji_to_romaji_module import kanji_to_romaji, prepare_kanjiblocks, translate_to_romaji, \
+    load_kanji_mapping_index, load_kana_mappings_dict
+from kanji_to_romaji.models import UnicodeRomajiMapping
+
+PARAGRAPH = u"吾輩は猫である。名前はまだ無い。どこで生れたかとんと見当がつかぬ。" \
+            u"何でも薄暗いじめじめした所でニャーニャー泣いていた事だけは記憶している。" \
+            u"吾輩はここで始めて人間というものを見た。しかもあとで聞くとそれは書生という人間中で一番獰悪な種族であったそうだ。" \
+            u"この書生というのは私たちを捕えて煮て食うという話である。しかしその当時は何という考もなかったから別段恐しいとも思わなかった。" \
+            u"ただ彼の掌に載せられてスーと持ち上げられた時何だかフワフワした感じがあったばかりである。"
+
+
+def bench(name, func, text, repeat):
+    start = time.time()
+    for _ in range(repeat):
+        func(text)
+    elapsed = time.time() - start
+    print(u"{0:<22} {1:>6} chars  {2:8.2f} ms/call".format(name, len(text), elapsed * 1000 / repeat))
+
+
+def main(repeat=20):
+    start = time.time()
+    UnicodeRomajiMapping.kanji_mapping = load_kanji_mapping_index()
+    UnicodeRomajiMapping.kana_mapping = load_kana_mappings_dict()
+    prepare_kanjiblocks(u"")
+    print(u"mappings loaded in {0:.2f} s".format(time.time() - start))
+
+    for paragraphs in [1, 4, 16]:
+        text = PARAGRAPH * paragraphs
+        bench(u"prepare_kanjiblocks", prepare_kanjiblocks, text, repeat)
+        bench(u"translate_to_romaji", translate_to_romaji, text, repeat)
+        bench(u"kanji_to_romaji", kanji_to_romaji, text, repeat)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
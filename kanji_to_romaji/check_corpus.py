@@ -0,0 +1,67 @@
+# coding=utf-8
+"""
+compare the translation functions against check_corpus.json
+the corpus was generated from the original replace()-based implementation, errors included,
+so any change in output, or in which inputs raise, shows up here
+usage: python -m kanji_to_romaji.check_corpus
+"""
+from __future__ import print_function
+import io
+import json
+import os
+import sys
+
+from kanji_to_romaji import kanji_to_romaji_module
+from kanji_to_romaji.kanji_to_romaji_module import load_kana_mappings_dict
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "check_corpus.json")
+FUNCTIONS = ["kanji_to_romaji", "translate_to_romaji", "translate_soukon", "translate_long_vowel",
+             "translate_soukon_ch", "translate_kana_iteration_mark"]
+
+
+def run(func, kana):
+    try:
+        return func(kana)
+    except Exception as e:
+        return {"error": type(e).__name__}
+
+
+def check_kana_mapping():
+    """
+    translate_to_romaji reads the text in a single pass, which is only equivalent to the old repeated
+    replace() passes if no romaji value contains a character of a two character key
+    and no two character key maps to an empty string
+    :return: list of problems with the kana mapping
+    """
+    kana_mapping = load_kana_mappings_dict()
+    two_char_keys = [k for k in kana_mapping if len(k) == 2]
+    two_char_chars = set("".join(two_char_keys))
+    problems = []
+    for k, v in kana_mapping.items():
+        if set(v) & two_char_chars:
+            problems.append(u"romaji of {0} contains a two character key character: {1}".format(k, v))
+    for k in two_char_keys:
+        if len(kana_mapping[k]) == 0:
+            problems.append(u"two character key {0} maps to an empty string".format(k))
+    return problems
+
+
+def main():
+    with io.open(CORPUS_PATH, encoding="utf8") as f:
+        corpus = json.load(f)
+
+    failures = check_kana_mapping()
+    for row in corpus:
+        for name in FUNCTIONS:
+            result = run(getattr(kanji_to_romaji_module, name), row["input"])
+            if result != row[name]:
+                failures.append(u"{0}({1!r}): expected {2!r}, got {3!r}".format(name, row["input"], row[name], result))
+
+    for failure in failures:
+        print(failure)
+    print(u"{0} inputs, {1} functions, {2} failures".format(len(corpus), len(FUNCTIONS), len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+# coding=utf-8
+"""
+compile the kanji json mappings in to the binary index loaded by kanji_to_romaji
+usage: python -m kanji_to_romaji.compile_mappings [output path]
+"""
+from __future__ import print_function
+import os
+import sys
+import time
+
+from kanji_to_romaji.kanji_to_romaji_module import compile_kanji_mappings, COMPILED_KANJI_MAPPINGS_PATH
+
+
+def main(path=COMPILED_KANJI_MAPPINGS_PATH):
+    start = time.time()
+    compile_kanji_mappings(path)
+    print(u"wrote {0} ({1} bytes) in {2:.2f} s".format(path, os.path.getsize(path), time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else COMPILED_KANJI_MAPPINGS_PATH)
@@ -2,8 +2,11 @@
 from __future__ import print_function
 from builtins import hex
 from builtins import range
+import bisect
 import os
+import re
 import sys
+import threading
 from collections import OrderedDict
 
 try:
@@ -15,9 +18,13 @@ except ImportError:
 from kanji_to_romaji.models import UnicodeRomajiMapping
 from kanji_to_romaji.models import KanjiBlock
 from kanji_to_romaji.models import Particle
+from kanji_to_romaji.mapping_index import MappingIndex, write_index, is_stale
 
 PATH_TO_MODULE = os.path.dirname(__file__)
 JP_MAPPINGS_PATH = os.path.join(PATH_TO_MODULE, "jp_mappings")
+COMPILED_KANJI_MAPPINGS_PATH = os.path.join(JP_MAPPINGS_PATH, "kanji_mappings.idx")
+
+_mappings_lock = threading.Lock()
 
 hiragana_iter_mark = u"ゝ"
 hiragana_voiced_iter_mark = u"ゞ"
@@ -82,6 +89,97 @@ def load_kanji_mappings_dict():
     return kanji_romaji_mapping
 
 
+def kanji_mapping_files():
+    return [os.path.join(JP_MAPPINGS_PATH, f) for f in os.listdir(JP_MAPPINGS_PATH)
+            if os.path.splitext(f)[1] == ".json" and "kanji" in f]
+
+
+def compile_kanji_mappings(path=COMPILED_KANJI_MAPPINGS_PATH):
+    """
+    build the binary kanji mapping index from the json mapping files
+    :param path: where to write the index
+    """
+    write_index(path, load_kanji_mappings_dict())
+
+
+def load_kanji_mapping_index(path=COMPILED_KANJI_MAPPINGS_PATH):
+    """
+    memory map the compiled kanji mapping, compiling it first if it is missing or older than the json files
+    falls back to the plain dict if the index can't be written or read
+    :param path: compiled index path
+    :return: MappingIndex or dict - kanji to romaji mapping
+    """
+    try:
+        if is_stale(path, kanji_mapping_files()):
+            compile_kanji_mappings(path)
+        try:
+            return MappingIndex(path)
+        except ValueError:  # written by an older version of the index format
+            compile_kanji_mappings(path)
+            return MappingIndex(path)
+    except (OSError, ValueError) as e:
+        print("Could not use compiled kanji mappings, loading json: {0}".format(e), file=sys.stderr)
+        return load_kanji_mappings_dict()
+
+
+def load_mappings():
+    """
+    fill the UnicodeRomajiMapping caches, safe to call from several threads
+    """
+    with _mappings_lock:
+        if len(UnicodeRomajiMapping.kana_mapping) == 0:
+            UnicodeRomajiMapping.kana_mapping = load_kana_mappings_dict()
+        if len(UnicodeRomajiMapping.kanji_mapping) == 0:
+            UnicodeRomajiMapping.kanji_mapping = load_kanji_mapping_index()
+        if not isinstance(UnicodeRomajiMapping.kanji_mapping, MappingIndex) and \
+                len(UnicodeRomajiMapping.kanji_prefixes) == 0:
+            UnicodeRomajiMapping.kanji_prefixes = load_kanji_prefixes(UnicodeRomajiMapping.kanji_mapping)
+
+
+def warm_mappings():
+    """
+    load the mappings on a daemon thread so the first translation doesn't pay for it
+    :return: the started thread
+    """
+    thread = threading.Thread(target=load_mappings, name="kanji_to_romaji warmup")
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def kanji_match_lengths(kana, start_pos):
+    """
+    :param kana: unicode containing kana and kanji characters
+    :param start_pos: position in kana to match from
+    :return: lengths of the kanji_mapping keys found at start_pos, shortest first
+    """
+    if isinstance(UnicodeRomajiMapping.kanji_mapping, MappingIndex):
+        return UnicodeRomajiMapping.kanji_mapping.match_lengths(kana, start_pos)
+
+    match_lens = []
+    end_pos = start_pos + 1
+    while end_pos <= len(kana) and kana[start_pos:end_pos] in UnicodeRomajiMapping.kanji_prefixes:
+        if kana[start_pos:end_pos] in UnicodeRomajiMapping.kanji_mapping:
+            match_lens.append(end_pos - start_pos)
+        end_pos += 1
+    return match_lens
+
+
+def load_kanji_prefixes(kanji_mapping):
+    """
+    collect every prefix of every kanji_mapping key
+    scanning forward from a position can stop as soon as the scanned characters are not in this set,
+    so the longest match at each position costs at most as many lookups as the longest key has characters
+    :param kanji_mapping: dict - kanji to romaji mapping
+    :return: set of unicode prefixes
+    """
+    prefixes = set()
+    for k in kanji_mapping:
+        for i in range(1, len(k) + 1):
+            prefixes.add(k[:i])
+    return prefixes
+
+
 def _convert_hira_kata_char(hira_or_kata_char, h_to_k=True):
     """
     take second last hex character from unicode and add/subtract 6 hex to it to get hiragana/katakana char
@@ -423,45 +521,49 @@ def prepare_kanjiblocks(kchar_list):
     create and replace matched Kanji characters that are within kanji_mapping with KanjiBlock
     KanjiBlock will be used for spacing and particle translation later
     if the kanji found is a verb stem then try to find an ending to match it with what's in kchar_list
-    :param kchar_list: list containing kana and kanji characters
-    :return: kchar_list with all found Kanji characters turned in to KanjiBlock objects
+    at every position the longest mapped key wins; shorter keys are only tried when a longer one is a verb stem
+    that neither matches an ending nor has another reading
+    :param kchar_list: unicode containing kana and kanji characters
+    :return: list of characters with all found Kanji characters turned in to KanjiBlock objects
     """
-    if len(UnicodeRomajiMapping.kanji_mapping) == 0:
-        UnicodeRomajiMapping.kanji_mapping = load_kanji_mappings_dict()
+    if len(UnicodeRomajiMapping.kanji_mapping) == 0 or \
+            (not isinstance(UnicodeRomajiMapping.kanji_mapping, MappingIndex) and
+             len(UnicodeRomajiMapping.kanji_prefixes) == 0):
+        load_mappings()
 
-    max_char_len = len(kchar_list)
-    kana_list = list(kchar_list)
+    kanji_mapping = UnicodeRomajiMapping.kanji_mapping
+    kana = "".join(kchar_list)
+    kana_list = []
 
     start_pos = 0
-    while start_pos < max_char_len:
-        char_len = len(kana_list) - start_pos
-        while char_len > 0:
-            curr_chars = "".join(kana_list[start_pos: (start_pos + char_len)])
-            if curr_chars in UnicodeRomajiMapping.kanji_mapping:
-                verb_stem_type = get_type_if_verb_stem(curr_chars)
-                ending_match_found = False
-                if verb_stem_type is not None:
-                    ending_kana, ending_romaji = check_for_verb_stem_ending(kana_list, curr_chars, start_pos, char_len)
-                    if ending_kana is not None and ending_romaji is not None:
-                        ending_match_found = True
-                        conjugated_val = {
-                            "romaji": get_verb_stem_romaji(curr_chars) + ending_romaji,
-                            "w_type": "conjugated " + verb_stem_type
-                        }
-
-                        for i in range(start_pos + char_len - 1 + len(ending_kana), start_pos - 1, -1):
-                            del kana_list[i]
-
-                        kana_list.insert(start_pos,
-                                         KanjiBlock(curr_chars + ending_kana, conjugated_val))
-
-                if ending_match_found is False and has_non_verb_stem_reading(curr_chars):
-                    for i in range(start_pos + char_len - 1, start_pos - 1, -1):
-                        del kana_list[i]
-                    kana_list.insert(start_pos,
-                                     KanjiBlock(curr_chars, UnicodeRomajiMapping.kanji_mapping[curr_chars]))
-            char_len -= 1
-        start_pos += 1
+    while start_pos < len(kana):
+        match_lens = kanji_match_lengths(kana, start_pos)
+
+        block = None
+        for char_len in reversed(match_lens):
+            curr_chars = kana[start_pos: (start_pos + char_len)]
+            verb_stem_type = get_type_if_verb_stem(curr_chars)
+            if verb_stem_type is not None:
+                ending_kana, ending_romaji = check_for_verb_stem_ending(kana, curr_chars, start_pos, char_len)
+                if ending_kana is not None and ending_romaji is not None:
+                    conjugated_val = {
+                        "romaji": get_verb_stem_romaji(curr_chars) + ending_romaji,
+                        "w_type": "conjugated " + verb_stem_type
+                    }
+                    block = KanjiBlock(curr_chars + ending_kana, conjugated_val)
+                    start_pos += char_len + len(ending_kana)
+                    break
+
+            if has_non_verb_stem_reading(curr_chars):
+                block = KanjiBlock(curr_chars, kanji_mapping[curr_chars])
+                start_pos += char_len
+                break
+
+        if block is None:
+            kana_list.append(kana[start_pos])
+            start_pos += 1
+        else:
+            kana_list.append(block)
     return kana_list
 
 
@@ -488,33 +590,54 @@ def prep_kanji(kana):
 def translate_to_romaji(kana):
     """
     translate hiragana, katakana, typographic, and fhw latin
+    two character mappings (e.g. キャ) win over translating their characters one at a time
+    no mapped romaji contains a character that starts a two character mapping, so one scan is enough
     :param kana: unicode kana(+kanji) characters
     :return: translated base kana characters to romaji as well as typographic, and fhw latin
     """
     if len(UnicodeRomajiMapping.kana_mapping) == 0:
         UnicodeRomajiMapping.kana_mapping = load_kana_mappings_dict()
 
-    max_char_len = 2
-
-    for char_len in range(max_char_len, 0, -1):
-        start_pos = 0
-        while start_pos < len(kana) - char_len + 1:
-            curr_chars = kana[start_pos: (start_pos + char_len)]
-            if curr_chars in UnicodeRomajiMapping.kana_mapping:
-                kana = kana.replace(curr_chars, UnicodeRomajiMapping.kana_mapping[curr_chars], 1)
-                if len(UnicodeRomajiMapping.kana_mapping[curr_chars]) == 0:
-                    start_pos -= 1
+    kana_mapping = UnicodeRomajiMapping.kana_mapping
+    romaji = []
+    start_pos = 0
+    while start_pos < len(kana):
+        curr_chars = kana[start_pos: (start_pos + 2)]
+        if len(curr_chars) == 2 and curr_chars in kana_mapping:
+            romaji.append(kana_mapping[curr_chars])
+            start_pos += 2
+        else:
+            romaji.append(kana_mapping.get(kana[start_pos], kana[start_pos]))
             start_pos += 1
 
-    while "  " in kana:
-        kana = kana.replace("  ", " ")
-    kana = kana.strip()
+    kana = re.sub(" {2,}", " ", "".join(romaji)).strip()
+    return "\n".join([line.strip() for line in kana.split("\n")])
 
-    lines = kana.split("\n")
-    for i in range(0, len(lines)):
-        lines[i] = lines[i].strip()
-    kana = "\n".join(lines)
-    return kana
+
+def _replace_last_occurrences(kana, replacements):
+    """
+    same result as kana = r.join(kana.rsplit(c, 1)) for every (c, r) in replacements, without rebuilding kana each time
+    each replacement takes the last c still left in kana, which isn't always the one that asked for it
+    :param kana: unicode
+    :param replacements: list of (char, replacement char) in the order they are applied
+    :return: unicode with replacements applied
+    """
+    if len(replacements) == 0:
+        return kana
+
+    chars = list(kana)
+    positions = dict((c, []) for c, r in replacements)
+    for i, c in enumerate(chars):
+        if c in positions:
+            positions[c].append(i)
+
+    for c, r in replacements:
+        if len(positions[c]) > 0:
+            i = positions[c].pop()
+            chars[i] = r
+            if r in positions:  # a soukon repeating a soukon can be replaced again later
+                bisect.insort(positions[r], i)
+    return "".join(chars)
 
 
 def translate_soukon(partial_kana):
@@ -526,12 +649,13 @@ def translate_soukon(partial_kana):
     :return: partial kana with soukon translated
     """
     prev_char = ""
+    replacements = []
 
     for c in reversed(partial_kana):
         if c == hirgana_soukon_unicode_char or c == katakana_soukon_unicode_char:  # assuming that soukon can't be last
-            partial_kana = prev_char[0].join(partial_kana.rsplit(c, 1))
+            replacements.append((c, prev_char[0]))
         prev_char = c
-    return partial_kana
+    return _replace_last_occurrences(partial_kana, replacements)
 
 
 def translate_long_vowel(partial_kana):
@@ -543,14 +667,15 @@ def translate_long_vowel(partial_kana):
     :return: partial kana with long vowel translated
     """
     prev_c = ""
+    translated = []
     for c in partial_kana:
         if c == katakana_long_vowel_mark:
             if prev_c[-1] in list("aeiou"):
-                partial_kana = partial_kana.replace(c, prev_c[-1], 1)
-            else:
-                partial_kana = partial_kana.replace(c, "", 1)
+                translated.append(prev_c[-1])
+        else:
+            translated.append(c)
         prev_c = c
-    return partial_kana
+    return "".join(translated)
 
 
 def translate_soukon_ch(kana):
@@ -564,13 +689,13 @@ def translate_soukon_ch(kana):
     prev_char = ""
     hiragana_chi_unicode_char = u"\u3061"
     katakana_chi_unicode_char = u"\u30C1"
-    partial_kana = kana
+    replacements = []
     for c in reversed(kana):
         if c == hirgana_soukon_unicode_char or c == katakana_soukon_unicode_char:  # assuming that soukon can't be last
             if prev_char == hiragana_chi_unicode_char or prev_char == katakana_chi_unicode_char:
-                partial_kana = "t".join(partial_kana.rsplit(c, 1))
+                replacements.append((c, "t"))
         prev_char = c
-    return partial_kana
+    return _replace_last_occurrences(kana, replacements)
 
 
 def _translate_dakuten_equivalent_char(kana_char):
@@ -616,15 +741,16 @@ def translate_kana_iteration_mark(kana):
     :return: unicode with kana iteration marks translated
     """
     prev_char = ""
-    partial_kana = kana
+    translated = []
     for c in kana:
         if c == hiragana_iter_mark or c == katakana_iter_mark:
-            partial_kana = prev_char.join(partial_kana.split(c, 1))
+            translated.append(prev_char)
         elif c == hiragana_voiced_iter_mark or c == katakana_voiced_iter_mark:
-            partial_kana = translate_dakuten_equivalent(prev_char).join(partial_kana.split(c, 1))
+            translated.append(translate_dakuten_equivalent(prev_char))
         else:
+            translated.append(c)
             prev_char = c
-    return partial_kana
+    return "".join(translated)
 
 
 def kanji_to_romaji(kana):
@@ -0,0 +1,229 @@
+# coding=utf-8
+"""
+compact binary form of the kanji mapping, memory mapped instead of parsed from json
+
+layout (all integers are native uint32):
+    header      magic, version, key count, string count, reading count, key blob size
+    keys        utf-8 keys sorted by their bytes (same order as unicode code points)
+    key offsets key count + 1 offsets in to the key blob
+    strings     string count + 1 offsets followed by the utf-8 blob of w_types and romaji, each stored once
+    records     per key: w_type, romaji, other_readings start, other_readings count
+    readings    per other reading: w_type, romaji
+
+build ahead of time with: python -m kanji_to_romaji.compile_mappings
+"""
+import array
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b"K2RM"
+VERSION = 1
+HEADER_FORMAT = "4sIIIII"
+RECORD_SIZE = 4
+
+
+def _align(f):
+    f.write(b"\0" * (-f.tell() % 4))
+
+
+def write_index(path, kanji_mapping):
+    """
+    write kanji_mapping (as returned by load_kanji_mappings_dict) to path
+    :param path: destination file, replaced atomically
+    :param kanji_mapping: dict - kanji to romaji mapping
+    """
+    strings = {}
+
+    def intern(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    encoded_keys = sorted((k.encode("utf8"), k) for k in kanji_mapping)
+    key_blob = bytearray()
+    key_offsets = array.array("I", [0])
+    records = array.array("I")
+    readings = array.array("I")
+    for encoded, k in encoded_keys:
+        key_blob += encoded
+        key_offsets.append(len(key_blob))
+
+        entry = kanji_mapping[k]
+        other_readings = entry.get("other_readings", {})
+        records.extend([intern(entry["w_type"]), intern(entry["romaji"]), len(readings) // 2, len(other_readings)])
+        for w_type, romaji in other_readings.items():
+            readings.extend([intern(w_type), intern(romaji)])
+
+    string_blob = bytearray()
+    string_offsets = array.array("I", [0])
+    for value in strings:
+        string_blob += value.encode("utf8")
+        string_offsets.append(len(string_blob))
+
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(handle, "wb") as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(encoded_keys), len(strings), len(readings) // 2,
+                            len(key_blob)))
+        f.write(bytes(key_blob))
+        _align(f)
+        f.write(key_offsets.tobytes())
+        f.write(string_offsets.tobytes())
+        f.write(bytes(string_blob))
+        _align(f)
+        f.write(records.tobytes())
+        f.write(readings.tobytes())
+    os.replace(temp_path, path)
+
+
+class _SortedKeys(object):
+    """sequence view of the encoded keys, used with bisect"""
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.key_count
+
+    def __getitem__(self, i):
+        return self.index.key_bytes(i)
+
+
+class MappingIndex(object):
+    """
+    read-only mapping over a file written by write_index
+    behaves like the dict from load_kanji_mappings_dict for lookups; entries are decoded on access
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.map) < struct.calcsize(HEADER_FORMAT):
+            self.map.close()
+            raise ValueError("{0} is too short for a kanji mapping index".format(path))
+        magic, version, self.key_count, string_count, reading_count, key_blob_size = \
+            struct.unpack_from(HEADER_FORMAT, self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError("{0} is not a version {1} kanji mapping index".format(path, VERSION))
+
+        view = memoryview(self.map)
+        position = struct.calcsize(HEADER_FORMAT)
+        self.keys_start = position
+        position += key_blob_size
+        position += -position % 4
+
+        self.key_offsets = view[position:position + 4 * (self.key_count + 1)].cast("I")
+        position += 4 * (self.key_count + 1)
+        self.string_offsets = view[position:position + 4 * (string_count + 1)].cast("I")
+        position += 4 * (string_count + 1)
+        self.strings_start = position
+        position += self.string_offsets[-1]
+        position += -position % 4
+
+        self.records = view[position:position + 4 * RECORD_SIZE * self.key_count].cast("I")
+        position += 4 * RECORD_SIZE * self.key_count
+        self.readings = view[position:position + 4 * 2 * reading_count].cast("I")
+
+        self.sorted_keys = _SortedKeys(self)
+        self.strings = [None] * string_count
+        self.entries = {}
+        # scans repeat the same prefixes for every occurrence of a word, so their ranges are kept
+        self.ranges = {}
+        self.max_cached_ranges = 100000
+
+    def key_bytes(self, i):
+        return self.map[self.keys_start + self.key_offsets[i]:self.keys_start + self.key_offsets[i + 1]]
+
+    def string(self, i):
+        if self.strings[i] is None:
+            start = self.strings_start + self.string_offsets[i]
+            self.strings[i] = self.map[start:self.strings_start + self.string_offsets[i + 1]].decode("utf8")
+        return self.strings[i]
+
+    def position(self, k):
+        lo, hi, exact = self.prefix_range(k)
+        return lo if exact else None
+
+    def match_lengths(self, text, start_pos):
+        """
+        lengths of every key that text has at start_pos, shortest first
+        the candidate key range narrows with each added character so the scan stops at the first unknown prefix
+        """
+        lengths = []
+        lo, hi = 0, self.key_count
+        for end_pos in range(start_pos + 1, len(text) + 1):
+            lo, hi, exact = self.prefix_range(text[start_pos:end_pos], lo, hi)
+            if lo == hi:
+                break
+            if exact:
+                lengths.append(end_pos - start_pos)
+        return lengths
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """
+        :param prefix: unicode prefix
+        :param lo, hi: a range known to contain every key starting with prefix
+        :return: (lo, hi, exact) - the keys starting with prefix are sorted_keys[lo:hi], exact if prefix is a key
+        """
+        if prefix in self.ranges:
+            return self.ranges[prefix]
+
+        hi = self.key_count if hi is None else hi
+        encoded = prefix.encode("utf8")
+        lo = bisect.bisect_left(self.sorted_keys, encoded, lo, hi)
+        # no utf-8 sequence contains 0xff, so this sorts after every key starting with prefix
+        hi = bisect.bisect_left(self.sorted_keys, encoded + b"\xff", lo, hi)
+        exact = lo < hi and self.key_bytes(lo) == encoded
+
+        if len(self.ranges) >= self.max_cached_ranges:
+            self.ranges.clear()
+        self.ranges[prefix] = lo, hi, exact
+        return lo, hi, exact
+
+    def entry(self, i):
+        if i not in self.entries:
+            w_type, romaji, readings_start, readings_count = self.records[RECORD_SIZE * i:RECORD_SIZE * (i + 1)]
+            entry = {"w_type": self.string(w_type), "romaji": self.string(romaji)}
+            if readings_count:
+                entry["other_readings"] = {}
+                for r in range(readings_start, readings_start + readings_count):
+                    entry["other_readings"][self.string(self.readings[2 * r])] = self.string(self.readings[2 * r + 1])
+            self.entries[i] = entry
+        return self.entries[i]
+
+    def __len__(self):
+        return self.key_count
+
+    def __contains__(self, k):
+        return isinstance(k, str) and self.position(k) is not None
+
+    def __getitem__(self, k):
+        i = self.position(k) if isinstance(k, str) else None
+        if i is None:
+            raise KeyError(k)
+        return self.entry(i)
+
+    def get(self, k, default=None):
+        return self[k] if k in self else default
+
+    def __iter__(self):
+        for i in range(self.key_count):
+            yield self.key_bytes(i).decode("utf8")
+
+    def keys(self):
+        return list(self)
+
+
+def is_stale(path, sources):
+    """
+    :param path: compiled index path
+    :param sources: json mapping files the index is built from
+    :return: True if the index is missing or older than one of the sources
+    """
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    return any(os.path.getmtime(source) > built for source in sources)
+
@@ -3,3 +3,4 @@ from builtins import object
 class UnicodeRomajiMapping(object):  # caching
     kana_mapping = {}
     kanji_mapping = {}
+    kanji_prefixes = set()
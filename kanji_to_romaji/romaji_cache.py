@@ -0,0 +1,71 @@
+# coding=utf-8
+from collections import OrderedDict
+
+from kanji_to_romaji.kanji_to_romaji_module import kanji_to_romaji
+
+
+def romanize_blocks(kana_list):
+    """
+    module level so it can be sent to worker processes
+    :param kana_list: list of unicode kana(+kanji) blocks
+    :return: list of romaji in the same order as kana_list
+    """
+    return [kanji_to_romaji(kana) for kana in kana_list]
+
+
+class RomajiCache(object):
+    """
+    least recently used cache in front of kanji_to_romaji
+    chat repeats the same short phrases and emotes, so most blocks are romanized only once
+    """
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, kana_list):
+        """
+        :param kana_list: list of unicode kana(+kanji) blocks
+        :return: (dict of the cached romaji, list of the distinct blocks that still need romanizing)
+        """
+        found = {}
+        missing = []
+        seen = set()
+        for kana in kana_list:
+            if kana in seen:
+                self.hits += 1
+            elif kana in self.items:
+                self.items.move_to_end(kana)
+                self.hits += 1
+                found[kana] = self.items[kana]
+            else:
+                self.misses += 1
+                missing.append(kana)
+            seen.add(kana)
+        return found, missing
+
+    def store(self, kana_list, romaji_list):
+        for kana, romaji in zip(kana_list, romaji_list):
+            self.items[kana] = romaji
+            self.items.move_to_end(kana)
+        while len(self.items) > self.max_entries:
+            self.items.popitem(last=False)
+
+    def romanize_many(self, kana_list):
+        """
+        romanize several blocks in one call; repeated blocks are only translated once
+        blocks are still translated separately since particles and spacing depend on the surrounding characters
+        :param kana_list: list of unicode kana(+kanji) blocks
+        :return: list of romaji in the same order as kana_list
+        """
+        found, missing = self.lookup(kana_list)
+        romaji_list = romanize_blocks(missing)
+        self.store(missing, romaji_list)
+        found.update(zip(missing, romaji_list))
+        return [found[kana] for kana in kana_list]
+
+    def statistics(self):
+        total = self.hits + self.misses
+        return {"entries": len(self.items), "hits": self.hits, "misses": self.misses,
+                "hit_rate": float(self.hits) / total if total else 0.0}
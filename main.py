@@ -72,6 +72,18 @@ def main():
     shared.enable_bg_game_rotation = utils.read_property('enable_bg_game_rotation', False)
     shared.banlist = utils.read_property('banlist', {})
 
+    shared.cache.http_pool = bot.http_pool
+    shared.avatars.http_pool = bot.http_pool
+    shared.avatars.ttl = utils.read_property('avatar_cache_ttl', shared.avatars.ttl)
+    shared.cache.scheduler.workers = utils.read_property('preload_concurrency', shared.cache.scheduler.workers)
+    shared.cache.preload_retries = utils.read_property('preload_retries', shared.cache.preload_retries)
+    shared.cache.rate_limiter.rate = utils.read_property('mal_requests_per_second', shared.cache.rate_limiter.rate)
+    shared.cache.rate_limiter.burst = utils.read_property('mal_requests_burst', shared.cache.rate_limiter.burst)
+    shared.cache.columnar = utils.read_property('columnar_lists', False)
+    shared.cache.list_fresh_ttl = utils.read_property('list_fresh_ttl', shared.cache.list_fresh_ttl)
+    shared.cache.list_max_age = utils.read_property('list_max_age', shared.cache.list_max_age)
+    shared.cache.max_cached_lists = utils.read_property('max_cached_lists', shared.cache.max_cached_lists)
+
     background.setup(bot, config)
     bot.run(config["OAuth_token"])
 
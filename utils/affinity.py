@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from utils import columnar
+
+# Same threshold as MAL.get_weighted_score: affinity needs more than 10 shared scores
+min_shared_scores = 10
+
+
+class AffinityMatrix():
+    def __init__(self, lists):
+        self.users = list(lists.keys())
+        self.positions = {user: i for i, user in enumerate(self.users)}
+        self.lookups = [columnar.score_lookup(entity_list) for entity_list in lists.values()]
+
+        self.scorers = {}
+        for i, lookup in enumerate(self.lookups):
+            for mal_id, score in lookup.items():
+                if mal_id not in self.scorers:
+                    self.scorers[mal_id] = []
+                self.scorers[mal_id].append((i, score))
+
+        self.rows = {}
+        if numpy is not None and self.users:
+            self.compute_all()
+
+    def row(self, mal_name):
+        if mal_name not in self.positions:
+            return {}
+        if mal_name not in self.rows:
+            self.rows[mal_name] = self.compute_row(self.positions[mal_name])
+        return self.rows[mal_name]
+
+    def compute_row(self, i):
+        sums = {}
+        for mal_id, x in self.lookups[i].items():
+            for j, y in self.scorers[mal_id]:
+                if j != i:
+                    if j not in sums:
+                        sums[j] = [0, 0, 0, 0, 0, 0]
+                    item = sums[j]
+                    item[0] += 1
+                    item[1] += x
+                    item[2] += y
+                    item[3] += x * x
+                    item[4] += y * y
+                    item[5] += x * y
+
+        row = {}
+        for j, user in enumerate(self.users):
+            if j != i:
+                n, sx, sy, sxx, syy, sxy = sums.get(j, [0, 0, 0, 0, 0, 0])
+                row[user] = (n, correlation(n, sx, sy, sxx, syy, sxy))
+        return row
+
+    def compute_all(self):
+        # Only titles scored by at least two users can contribute to a pair
+        shared_ids = [mal_id for mal_id, items in self.scorers.items() if len(items) > 1]
+        columns = {mal_id: k for k, mal_id in enumerate(shared_ids)}
+
+        scores = numpy.zeros((len(self.users), len(shared_ids)))
+        for mal_id, items in self.scorers.items():
+            if mal_id in columns:
+                for i, score in items:
+                    scores[i, columns[mal_id]] = score
+        mask = (scores > 0).astype(float)
+
+        n = mask @ mask.T
+        sx = scores @ mask.T
+        sxx = (scores * scores) @ mask.T
+        sxy = scores @ scores.T
+
+        for i, user in enumerate(self.users):
+            row = {}
+            for j, other in enumerate(self.users):
+                if j != i:
+                    shared = int(n[i, j])
+                    row[other] = (shared, correlation(shared, sx[i, j], sx[j, i], sxx[i, j], sxx[j, i], sxy[i, j]))
+            self.rows[user] = row
+
+
+def correlation(n, sx, sy, sxx, syy, sxy):
+    if n <= min_shared_scores:
+        return None
+
+    numerator = n * sxy - sx * sy
+    variance = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if variance <= 0:
+        return None
+    return float(numerator / math.sqrt(variance)) * 100
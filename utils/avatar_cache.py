@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+import time
+
+
+class AvatarCache():
+    def __init__(self, path='data/cache/avatars.json', ttl=3600 * 24):
+        self.path = path
+        self.ttl = ttl
+        self.http_pool = None
+        self.timeout = 15
+
+        self.entries = None
+        self.pending = set()
+        self.dirty = False
+
+    def require_entries(self):
+        if self.entries is None:
+            self.entries = {}
+            try:
+                if os.path.exists(self.path):
+                    with open(self.path) as f:
+                        self.entries = json.load(f)
+            except Exception as e:
+                print(f'Could not read avatar cache: {e}')
+        return self.entries
+
+    def get(self, mal_name):
+        """Returns the cached avatar url right away and schedules a refresh if it is missing or stale"""
+        key = mal_name.lower()
+        entry = self.require_entries().get(key)
+        if entry is None or self.is_stale(entry):
+            self.schedule_refresh(mal_name)
+        return entry[0] if entry else None
+
+    def is_stale(self, entry):
+        return time.time() - entry[1] > self.ttl
+
+    def schedule_refresh(self, mal_name):
+        key = mal_name.lower()
+        if self.http_pool is None or key in self.pending:
+            return
+        self.pending.add(key)
+
+        async def refresh_and_save():
+            await self.refresh(mal_name)
+            self.save()
+
+        asyncio.ensure_future(refresh_and_save())
+
+    async def refresh(self, mal_name):
+        key = mal_name.lower()
+        self.pending.add(key)
+        try:
+            data = await self.http_pool.json(f'https://imal.iatgof.com/app.php/2.2/profile/{mal_name}', timeout=self.timeout)
+            self.require_entries()[key] = [data.get('avatar_url'), time.time()]
+            self.dirty = True
+        except Exception as e:
+            print(f'Could not load avatar for {mal_name}: {e}')
+        finally:
+            self.pending.discard(key)
+
+    async def refresh_stale(self, mal_names, delay=1):
+        entries = self.require_entries()
+        for mal_name in mal_names:
+            entry = entries.get(mal_name.lower())
+            if entry is None or self.is_stale(entry):
+                await self.refresh(mal_name)
+                await asyncio.sleep(delay)
+        self.save()
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f'Could not write avatar cache: {e}')
@@ -3,7 +3,18 @@ import asyncio
 import discord
 from discord.ext import commands
 
+from utils import http_pool
+
 class AndreBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super(AndreBot, self).__init__(*args, **kwargs)
+        self.http_pool = http_pool.HTTPPool()
+
+    @asyncio.coroutine
+    def close(self):
+        yield from self.http_pool.close()
+        yield from super(AndreBot, self).close()
+
     @asyncio.coroutine
     def send_message(self, destination, content=None, *, tts=False, embed=None):
         if content is not None:
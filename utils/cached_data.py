@@ -3,11 +3,15 @@
 import asyncio
 import discord
 import datetime
-import aiohttp
-import urllib.request, json
+import time
+import os
+import gzip
+import heapq
+from collections import OrderedDict
+import json
 from discord.ext import commands
 
-from utils import database
+from utils import database, columnar, affinity, fetch_scheduler
 
 class CachedData():
     def __init__(self):
@@ -21,6 +25,51 @@ class CachedData():
 
         self.airing = []
 
+        self.entity_index = {'anime': {}, 'manga': {}}
+        self.title_stats = {'anime': {}, 'manga': {}}
+        self.list_generation = {'anime': 0, 'manga': 0}
+        self.affinity_matrices = {}
+        self.user_stats_cache = {}
+
+        self.columnar = False
+        # Anime and manga ids overlap, so each entity interns its titles separately
+        self.titles = {'anime': columnar.TitleTable(), 'manga': columnar.TitleTable()}
+
+        self.http_pool = None
+
+        self.scheduler = fetch_scheduler.FetchScheduler(workers=8)
+        self.rate_limiter = fetch_scheduler.TokenBucket(rate=5.0, burst=5)
+        self.preload_retries = 3
+        self.retry_backoff = 2.0
+
+        self.list_updated = {'anime': {}, 'manga': {}}
+        self.snapshot_path = 'data/cache/mal_lists.json.gz'
+        self.snapshot_max_age = 3600 * 12
+        self.snapshot_delay = 60
+        self.snapshot_loaded = False
+        self.snapshot_lock = asyncio.Lock()
+        self.snapshot_task = None
+
+        self.incremental_margin = 300
+
+        # Lists older than list_fresh_ttl are still served but refreshed in the background,
+        # lists older than list_max_age are dropped and loaded again before being served
+        self.list_fresh_ttl = 3600 * 6
+        self.list_max_age = 3600 * 24 * 3
+        self.revalidating = set()
+        # Least recently used lists are evicted above this many cached lists (0 to disable).
+        # Lists of registered users are never evicted, require_entity_lists needs all of them,
+        # so the limit only applies to lists loaded for other names (e.g. !affinity with any MAL user)
+        self.max_cached_lists = 0
+        self.list_access = OrderedDict()
+        self.registered_names = set()
+
+        self.missing_loads = {}
+        self.progress_interval = 5
+        # Lists that failed to load (private or deleted accounts) are not retried before their time here
+        self.failed_loads = {'anime': {}, 'manga': {}}
+        self.failed_retry_delay = 3600
+
     def clear(self):
         self.last_update = None
         self.animelists = {}
@@ -31,147 +80,367 @@ class CachedData():
 
         self.airing = []
 
+        self.entity_index = {'anime': {}, 'manga': {}}
+        self.title_stats = {'anime': {}, 'manga': {}}
+        for entity in self.list_generation:
+            self.list_generation[entity] += 1
+        self.affinity_matrices = {}
+        self.user_stats_cache = {}
+        for titles in self.titles.values():
+            titles.clear()
+        self.list_updated = {'anime': {}, 'manga': {}}
+        self.list_access = OrderedDict()
+        self.failed_loads = {'anime': {}, 'manga': {}}
+        self.snapshot_loaded = True
+        try:
+            os.remove(self.snapshot_path)
+        except OSError:
+            pass
+
     async def require_airing(self):
         self.check_cache_expiry()
         if self.airing:
             return self.airing
 
-        async with aiohttp.ClientSession() as session:
-            data = await self.load_api_data(session, 'http://iatgof.com/imal/airing.json')
-            self.airing = data
+        data = await self.load_api_data('http://iatgof.com/imal/airing.json')
+        self.airing = data
+        self.schedule_snapshot()
         return self.airing
 
-    async def preload_all(self):
+    async def preload_all(self, only_stale=False):
         print('Preloading lists...')
-        session = database.new_session()
-        users = session.query(database.User).filter(database.User.mal_name.isnot(None)).all()
+        start = time.time()
+        await self.require_snapshot()
+
+        with database.session_scope() as session:
+            users = session.query(database.User).filter(database.User.mal_name.isnot(None)).all()
+        self.registered_names = {user.mal_name for user in users}
+        if only_stale:
+            users = [user for user in users if self.is_stale(user.mal_name, 'anime') or self.is_stale(user.mal_name, 'manga')]
+
+        failures = {'anime': 0, 'manga': 0}
+
+        async def preload_one(mal_name, entity):
+            try:
+                await self.fetch_entity_list(mal_name, entity, fetch_scheduler.PRIORITY_BACKGROUND, retry=True)
+            except Exception as e:
+                print(f'Error getting {mal_name}\'s {entity}list: {e}')
+                failures[entity] += 1
+
+        print(f'Downloading lists for {len(users)} users ({self.scheduler.workers} at a time)...')
+        await asyncio.gather(*[preload_one(user.mal_name, entity) for entity in ['anime', 'manga'] for user in users])
 
         for entity in ['anime', 'manga']:
-            print(f'Downloading {entity} lists...')
-            downloaded = self.animelists if entity == 'anime' else self.mangalists
-            dl_stats = self.anime_stats if entity == 'anime' else self.manga_stats
-            async with aiohttp.ClientSession() as session:
-                for user in users:
-                    try:
-                        list = await self.load_entity_list(user.mal_name, session, entity=entity)
-                        downloaded[user.mal_name] = list[entity]
-                        dl_stats[user.mal_name] = list['statistics']
-                    except:
-                        pass
-
-            if downloaded:
-                print('Download complete')
-                if entity == 'anime':
-                    self.animelists = downloaded
-                    self.anime_stats = dl_stats
-                elif entity == 'manga':
-                    self.mangalists = downloaded
-                    self.manga_stats = dl_stats
+            print(f'Downloaded {len(users) - failures[entity]}/{len(users)} {entity} lists ({failures[entity]} failures)')
 
         print('Preloading airing...')
         await self.require_airing()
-        print('Done.')
+        print('Done in {0:.1f}s.'.format(time.time() - start))
 
         self.last_update = datetime.datetime.now()
+        await self.save_snapshot()
 
-    async def require_entity_lists(self, ctx, entity):
-        session = database.new_session()
-        users = session.query(database.User).filter(database.User.mal_name.isnot(None)).all()
+    async def require_entity_lists(self, ctx, entity, partial=False):
+        """With partial set, answers right away from the cached lists while the missing ones load in the background"""
+        await self.require_snapshot()
+        with database.session_scope() as session:
+            users = session.query(database.User).filter(database.User.mal_name.isnot(None)).all()
 
         self.cleanup_cache(users)
-        self.check_cache_expiry()
+        self.check_cache_expiry(entity, [user.mal_name for user in users])
         if len(self.entitylists(entity)) >= len(users):
             return self.entitylists(entity)
-        else:
-            errors = []
-            loaded = 0
-            loading_message = await ctx.bot.say(f'Refreshing cached {entity}lists...')
-            async with aiohttp.ClientSession() as session:
-                for user in users:
-                    if user.mal_name not in self.entitylists(entity):
-                        try:
-                            if user.mal_name:
-                                list = await self.load_entity_list(user.mal_name, session, entity=entity)
-                                self.set_entitylists(entity, user.mal_name, list[entity])
-                                self.set_stats(entity, user.mal_name, list['statistics'])
-
-                            loaded += 1
-                            if user.mal_name:
-                                await ctx.bot.edit_message(loading_message, f'Refreshing cached {entity}lists... ({loaded}/{len(users)})')
-                        except Exception as e:
-                            errors.append(f'Error getting {user.mal_name}\'s {entity}list: {e}')
-
-            await ctx.bot.delete_message(loading_message)
-            #if errors:
-            #    await ctx.bot.edit_message(loading_message, f'Finished loading with {len(errors)} errors.\n')
-            #else:
-            #    await ctx.bot.edit_message(loading_message, f'Loaded {len(self.entitylists(entity))} lists.')
 
+        now = time.time()
+        absent = [user.mal_name for user in users if user.mal_name not in self.entitylists(entity)]
+        failed = [mal_name for mal_name in absent if self.failed_loads[entity].get(mal_name, 0) > now]
+        missing = [mal_name for mal_name in absent if mal_name not in failed]
+        if not missing:
+            if partial and failed:
+                return PartialLists(self.entitylists(entity), missing=0, failed=len(failed))
+            return self.entitylists(entity)
+
+        load = self.missing_loads.get(entity)
+        if load is None or load.done():
+            # The task runs outside the command, where ctx.bot.say can't find the channel anymore
+            load = self.missing_loads[entity] = asyncio.ensure_future(
+                self.load_missing_entity_lists(ctx.bot, ctx.message.channel, entity, missing, len(users)))
+
+        if partial:
+            return PartialLists(self.entitylists(entity), missing=len(missing), failed=len(failed))
+
+        await asyncio.shield(load)
         self.last_update = datetime.datetime.now()
         return self.entitylists(entity)
 
-    async def require_entity_list(self, ctx, mal_name, entity, force_reload=False):
-        self.check_cache_expiry()
+    async def load_missing_entity_lists(self, bot, channel, entity, mal_names, total):
+        errors = []
+        loaded = 0
+        last_edit = time.time()
+        loading_message = None
+        try:
+            loading_message = await bot.send_message(channel, f'Refreshing cached {entity}lists...')
+        except Exception as e:
+            print(f'Could not send the {entity}list progress message: {e}')
+
+        async def update_progress():
+            try:
+                await bot.edit_message(loading_message, f'Refreshing cached {entity}lists... ({loaded}/{total})')
+            except Exception as e:
+                print(f'Could not update the {entity}list progress message: {e}')
+
+        async def load_one(mal_name):
+            nonlocal loaded, last_edit
+            try:
+                await self.fetch_entity_list(mal_name, entity, fetch_scheduler.PRIORITY_COMMAND)
+                loaded += 1
+            except Exception as e:
+                errors.append(f'Error getting {mal_name}\'s {entity}list: {e}')
+                self.failed_loads[entity][mal_name] = time.time() + self.failed_retry_delay
+                return
+
+            # Throttled so a cold cache does not turn into one message edit per user
+            if loading_message and time.time() - last_edit >= self.progress_interval:
+                last_edit = time.time()
+                await update_progress()
+
+        await asyncio.gather(*[load_one(mal_name) for mal_name in mal_names])
+
+        if loading_message:
+            try:
+                await bot.delete_message(loading_message)
+            except Exception as e:
+                print(f'Could not delete the {entity}list progress message: {e}')
+        #if errors:
+        #    await ctx.bot.edit_message(loading_message, f'Finished loading with {len(errors)} errors.\n')
+        #else:
+        #    await ctx.bot.edit_message(loading_message, f'Loaded {len(self.entitylists(entity))} lists.')
+        self.schedule_snapshot()
+        self.last_update = datetime.datetime.now()
+
+    async def require_entity_list(self, ctx, mal_name, entity, force_reload=False, incremental=False, priority=fetch_scheduler.PRIORITY_COMMAND):
+        await self.require_snapshot()
+        self.check_cache_expiry(entity, [mal_name])
         if mal_name in self.entitylists(entity) and not force_reload:
+            self.touch_entitylist(entity, mal_name)
             return self.entitylists(entity)[mal_name]
 
-        async with aiohttp.ClientSession() as session:
+        try:
+            list = await self.fetch_entity_list(mal_name, entity, priority, incremental=incremental)
+            self.schedule_snapshot()
+            return list[entity]
+        except Exception as e:
+            await ctx.bot.say(f'Error getting {mal_name}\'s {entity}list: {e}')
+        return None
+
+    async def fetch_entity_list(self, mal_name, entity, priority, incremental=False, retry=False):
+        """Downloads and stores a list through the scheduler, sharing the download with any concurrent request for it"""
+        async def load():
+            if incremental:
+                list = await self.load_entity_list_updates(mal_name, entity=entity)
+            elif retry:
+                list = await self.load_entity_list_with_retry(mal_name, entity=entity)
+            else:
+                list = await self.load_entity_list(mal_name, entity=entity)
+            self.set_entitylists(entity, mal_name, list[entity])
+            self.set_stats(entity, mal_name, list['statistics'])
+            self.failed_loads[entity].pop(mal_name, None)
+            return list
+
+        return await self.scheduler.fetch((mal_name, entity), load, priority)
+
+    def check_cache_expiry(self, entity=None, keys=()):
+        now = time.time()
+        for key in keys:
+            updated = self.list_updated[entity].get(key)
+            if updated is None or key not in self.entitylists(entity):
+                continue
+
+            age = now - updated
+            if age > self.list_max_age:
+                self.remove_entitylist(entity, key)
+            else:
+                self.touch_entitylist(entity, key)
+                if age > self.list_fresh_ttl:
+                    self.revalidate_entitylist(entity, key)
+
+    def revalidate_entitylist(self, entity, key):
+        if (key, entity) in self.revalidating or self.scheduler.is_pending((key, entity)):
+            return
+        self.revalidating.add((key, entity))
+
+        async def revalidate():
             try:
-                list = await self.load_entity_list(mal_name, session, entity=entity)
-                self.set_entitylists(entity, mal_name, list[entity])
-                self.set_stats(entity, mal_name, list['statistics'])
-                return list[entity]
+                await self.fetch_entity_list(key, entity, fetch_scheduler.PRIORITY_BACKGROUND, incremental=True)
+                self.schedule_snapshot()
             except Exception as e:
-                await ctx.bot.say(f'Error getting {mal_name}\'s {entity}list: {e}')
-        return None
+                print(f'Error refreshing {key}\'s {entity}list: {e}')
+            finally:
+                self.revalidating.discard((key, entity))
+
+        asyncio.ensure_future(revalidate())
 
-    def check_cache_expiry(self):
-        pass
-        #if self.last_update and (datetime.datetime.now() - self.last_update).total_seconds() > 86400:
-            #self.animelists = {}
-            #self.mangalists = {}
-            #self.airing = []
+    def touch_entitylist(self, entity, key):
+        if (entity, key) in self.list_access:
+            self.list_access.move_to_end((entity, key))
+        else:
+            self.list_access[(entity, key)] = True
+
+    def enforce_list_limit(self):
+        if not self.max_cached_lists:
+            return
+
+        unpinned = [(entity, key) for entity, key in self.list_access if key not in self.registered_names]
+        for entity, key in unpinned[:max(0, len(unpinned) - self.max_cached_lists)]:
+            self.remove_entitylist(entity, key)
 
     def cleanup_cache(self, users):
         lookup = {}
         for user in users:
             lookup[user.mal_name] = user
+        self.registered_names = set(lookup)
 
-        def delete_from(alist, lookup):
-            for item in list(alist.keys()):
+        for entity in ['anime', 'manga']:
+            for item in list(self.entitylists(entity).keys()):
                 if not item in lookup:
-                    del alist[item]
+                    self.remove_entitylist(entity, item)
+
+    def is_stale(self, mal_name, entity):
+        updated = self.list_updated[entity].get(mal_name)
+        return updated is None or time.time() - updated > self.snapshot_max_age
+
+    async def require_snapshot(self):
+        async with self.snapshot_lock:
+            if self.snapshot_loaded:
+                return
+            self.snapshot_loaded = True
+
+            try:
+                data = await asyncio.get_event_loop().run_in_executor(None, self.read_snapshot)
+            except Exception as e:
+                print(f'Could not read lists snapshot: {e}')
+                return
+
+            for entity in ['anime', 'manga']:
+                for mal_name, item in data.get(entity, {}).items():
+                    if mal_name not in self.entitylists(entity):
+                        self.set_entitylists(entity, mal_name, item['list'], updated=item['updated'])
+                        self.set_stats(entity, mal_name, item['stats'])
+            if not self.airing:
+                self.airing = data.get('airing', [])
+            print(f'Loaded {len(self.animelists)} anime and {len(self.mangalists)} manga lists from snapshot.')
+
+    def read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return {}
+        with gzip.open(self.snapshot_path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write_snapshot(self, data):
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        temp_path = f'{self.snapshot_path}.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, self.snapshot_path)
+
+    async def save_snapshot(self):
+        data = {'airing': self.airing}
+        for entity in ['anime', 'manga']:
+            stats = self.stats(entity)
+            data[entity] = {mal_name: {'updated': self.list_updated[entity].get(mal_name, 0),
+                                       'list': columnar.serializable(list),
+                                       'stats': stats.get(mal_name, {'days': 0})}
+                            for mal_name, list in self.entitylists(entity).items()}
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self.write_snapshot, data)
+        except Exception as e:
+            print(f'Could not write lists snapshot: {e}')
+
+    def schedule_snapshot(self):
+        if self.snapshot_task and not self.snapshot_task.done():
+            return
 
-        delete_from(self.animelists, lookup)
-        delete_from(self.mangalists, lookup)
+        async def delayed_save():
+            await asyncio.sleep(self.snapshot_delay)
+            await self.save_snapshot()
+
+        self.snapshot_task = asyncio.ensure_future(delayed_save())
 
 
     def get_entity_list(self, mal_name, entity, default=None):
         return self.entitylists(entity)[mal_name] if mal_name in self.entitylists(entity) else default
 
-    async def load_entity_list(self, username, session, entity):
+    async def load_entity_list(self, username, entity):
         offset = 0
         data = []
         while True:
-            newdata = await self.load_api_data(session, f'https://myanimelist.net/{entity}list/{username}/load.json?status=7&offset={offset}')
+            newdata = await self.load_api_data(f'https://myanimelist.net/{entity}list/{username}/load.json?status=7&offset={offset}')
             data += newdata
             if len(newdata) < 300:
                 return self.translate_malapi_to_atarashii(data, entity)
             else:
                 offset += len(newdata)
 
-    async def load_api_data(self, session, url_string):
-        async with session.get(url_string) as response:
-            data = json.loads(await response.read())
+    async def load_entity_list_updates(self, username, entity):
+        cached = self.entitylists(entity).get(username)
+        since = self.list_updated[entity].get(username)
+        if cached is None or since is None:
+            return await self.load_entity_list(username, entity=entity)
+
+        # Entries are sorted by last update, so everything after the first unchanged entry is already cached
+        lookup = {item['id']: item for item in cached}
+        since -= self.incremental_margin
+        offset = 0
+        updated = []
+        while True:
+            newdata = await self.load_api_data(f'https://myanimelist.net/{entity}list/{username}/load.json?status=7&order=5&offset={offset}')
+            for item in self.translate_malapi_to_atarashii(newdata, entity)[entity]:
+                if self.is_entry_unchanged(item, lookup.get(item['id']), since):
+                    return self.merge_entity_list(updated, cached, entity)
+                updated.append(item)
+
+            if len(newdata) < 300:
+                # Went through the whole list, which also drops the entries that were removed from it
+                return self.merge_entity_list(updated, cached, entity, complete=True)
+            offset += len(newdata)
+
+    def is_entry_unchanged(self, item, cached_item, since):
+        if cached_item is None:
+            return False
+        if item.get('mal_updated'):
+            return item['mal_updated'] <= since
+        return dict(cached_item) == item
+
+    def merge_entity_list(self, updated, cached, entity, complete=False):
+        # Keep the cached order so !animelist/!mangalist look the same as after a full reload, new entries go last
+        updated_lookup = {item['id']: item for item in updated}
+        merged = [updated_lookup.pop(item['id'], item) for item in cached if not complete or item['id'] in updated_lookup]
+        merged += [item for item in updated if item['id'] in updated_lookup]
+        return {entity: merged, 'statistics': {'days': 0}}
+
+    async def load_entity_list_with_retry(self, username, entity):
+        attempt = 0
+        while True:
             try:
-                if 'error' in data:
-                    raise Exception(data['error'])
-                elif 'errors' in data:
-                    raise Exception(data['errors'][0]['message'])
-                else:
-                    return data
-            except Exception as e:
-                print(e)
+                return await self.load_entity_list(username, entity=entity)
+            except Exception:
+                attempt += 1
+                if attempt >= self.preload_retries:
+                    raise
+                await asyncio.sleep(self.retry_backoff * (2 ** (attempt - 1)))
+
+    async def load_api_data(self, url_string):
+        await self.rate_limiter.acquire()
+        data = await self.http_pool.json(url_string)
+        try:
+            if 'error' in data:
+                raise Exception(data['error'])
+            elif 'errors' in data:
+                raise Exception(data['errors'][0]['message'])
+            else:
+                return data
+        except Exception as e:
+            print(e)
         raise Exception('Could not read data')
 
     def translate_malapi_to_atarashii(self, userlist, entity):
@@ -197,6 +466,7 @@ class CachedData():
                 'num_read_chapters': 'chapters_read',
                 'num_read_volumes': 'volumes_read',
                 'score': 'score',
+                'updated_at': 'mal_updated',
 
             }
 
@@ -212,11 +482,83 @@ class CachedData():
 
         return {entity: list(map(translate_item, userlist)), 'statistics': {'days': 0}}
 
-    def set_entitylists(self, entity, key, value):
-        if entity == 'anime':
-            self.animelists[key] = value
-        elif entity == 'manga':
-            self.mangalists[key] = value
+    def set_entitylists(self, entity, key, value, updated=None):
+        if entity not in ['anime', 'manga']:
+            return
+
+        if self.columnar and not isinstance(value, columnar.ColumnarList):
+            value = columnar.ColumnarList(entity, value, self.titles[entity])
+
+        self.unindex_entitylist(entity, key)
+        self.entitylists(entity)[key] = value
+        self.list_updated[entity][key] = updated or time.time()
+        self.index_entitylist(entity, key)
+        self.list_generation[entity] += 1
+        self.user_stats_cache.pop((key, entity), None)
+        self.touch_entitylist(entity, key)
+        self.enforce_list_limit()
+
+    def remove_entitylist(self, entity, key):
+        self.unindex_entitylist(entity, key)
+        self.entitylists(entity).pop(key, None)
+        self.list_updated[entity].pop(key, None)
+        self.stats(entity).pop(key, None)
+        self.list_access.pop((entity, key), None)
+        self.list_generation[entity] += 1
+        self.user_stats_cache.pop((key, entity), None)
+
+    def affinity_matrix(self, entity):
+        generation, matrix = self.affinity_matrices.get(entity, (None, None))
+        if generation != self.list_generation[entity]:
+            matrix = affinity.AffinityMatrix(self.entitylists(entity))
+            self.affinity_matrices[entity] = (self.list_generation[entity], matrix)
+        return matrix
+
+    def index_entitylist(self, entity, key):
+        index = self.entity_index[entity]
+        for item in self.entitylists(entity)[key]:
+            if item['id'] not in index:
+                index[item['id']] = {}
+            if key not in index[item['id']]:
+                index[item['id']][key] = item
+                self.update_title_stats(entity, item, 1)
+
+    def unindex_entitylist(self, entity, key):
+        index = self.entity_index[entity]
+        for item in self.entitylists(entity).get(key, []):
+            entries = index.get(item['id'])
+            if entries is not None and key in entries:
+                self.update_title_stats(entity, entries.pop(key), -1)
+                if not entries:
+                    del index[item['id']]
+                    self.title_stats[entity].pop(item['id'], None)
+
+    def update_title_stats(self, entity, item, sign):
+        # [members, completed, score sum, score count]
+        stats = self.title_stats[entity].get(item['id'])
+        if stats is None:
+            stats = self.title_stats[entity][item['id']] = [0, 0, 0, 0]
+        stats[0] += sign
+        if item.get(columnar.status_keys[entity]) == 'completed':
+            stats[1] += sign
+        score = item.get('score', 0)
+        if score > 0:
+            stats[2] += sign * score
+            stats[3] += sign
+
+    def entries_for_id(self, entity, mal_id):
+        return self.entity_index[entity].get(mal_id, {})
+
+    def top_titles(self, entity, key, count, reverse=False):
+        """Returns up to count title ids ordered by key(stats), highest first unless reverse is set"""
+        items = self.title_stats[entity].items()
+        if count <= 0:
+            ordered = sorted(items, key=lambda x: key(x[1]), reverse=not reverse)
+        elif reverse:
+            ordered = heapq.nsmallest(count, items, key=lambda x: key(x[1]))
+        else:
+            ordered = heapq.nlargest(count, items, key=lambda x: key(x[1]))
+        return [mal_id for mal_id, stats in ordered]
 
     def entitylists(self, entity):
         if entity == 'anime':
@@ -230,11 +572,27 @@ class CachedData():
             self.anime_stats[key] = value
         elif entity.lower() == 'manga':
             self.manga_stats[key] = value
+        self.user_stats_cache.pop((key, entity.lower()), None)
         return None
 
+    def user_stats(self, mal_name, entity, builder):
+        """Returns the statistics built by builder(mal_name), kept until the user's list or stats are replaced"""
+        key = (mal_name, entity)
+        if key not in self.user_stats_cache:
+            self.user_stats_cache[key] = builder(mal_name)
+        return self.user_stats_cache[key]
+
     def stats(self, entity):
         if entity.lower() == 'anime':
             return self.anime_stats
         elif entity.lower() == 'manga':
             return self.manga_stats
         return None
+
+
+class PartialLists(dict):
+    """Copy of the cached lists handed out while some lists are still loading"""
+    def __init__(self, lists, missing, failed=0):
+        super(PartialLists, self).__init__(lists)
+        self.missing = missing
+        self.failed = failed
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+import array
+import sys
+from collections.abc import Mapping, Sequence
+
+statuses = {
+    'anime': ['', 'watching', 'completed', 'on-hold', 'dropped', 'plan to watch'],
+    'manga': ['', 'reading', 'completed', 'on-hold', 'dropped', 'plan to read']
+}
+
+status_keys = {'anime': 'watched_status', 'manga': 'read_status'}
+
+progress_keys = {'anime': ['watched_episodes'], 'manga': ['chapters_read', 'volumes_read']}
+
+# Fields that describe the title itself rather than the user's entry, shared between all lists of an entity
+title_keys = ['title', 'image_url', 'type', 'episodes', 'chapters', 'volumes', 'status']
+
+
+class TitleTable():
+    def __init__(self):
+        self.items = {}
+
+    def intern(self, item):
+        fields = {}
+        for key in title_keys:
+            if key in item:
+                value = item[key]
+                fields[key] = sys.intern(value) if isinstance(value, str) else value
+
+        current = self.items.get(item['id'])
+        if current != fields:
+            self.items[item['id']] = fields
+
+    def get(self, mal_id):
+        return self.items.get(mal_id, {})
+
+    def clear(self):
+        self.items = {}
+
+
+class ColumnarList(Sequence):
+    def __init__(self, entity, items, titles):
+        self.entity = entity
+        self.titles = titles
+        self.status_key = status_keys[entity]
+        self.status_codes = {status: code for code, status in enumerate(statuses[entity])}
+
+        self.ids = array.array('l')
+        self.scores = array.array('b')
+        self.statuses = array.array('b')
+        self.last_updated = array.array('q')
+        self.progress = {key: array.array('l') for key in progress_keys[entity]}
+
+        # Sparse per-row data: keys missing from the original entry and keys with no column
+        self.absent = {}
+        self.extras = {}
+
+        columns = ['id', 'score', self.status_key, 'last_updated'] + progress_keys[entity]
+        for row, item in enumerate(items):
+            titles.intern(item)
+
+            self.ids.append(item['id'])
+            self.scores.append(item.get('score', 0))
+            self.statuses.append(self.status_codes.get(item.get(self.status_key, ''), 0))
+            self.last_updated.append(item.get('last_updated', 0) or 0)
+            for key, column in self.progress.items():
+                column.append(item.get(key, 0))
+
+            absent = [key for key in columns if key not in item]
+            if absent:
+                self.absent[row] = set(absent)
+            extras = {key: value for key, value in item.items() if key not in columns and key not in title_keys}
+            if extras:
+                self.extras[row] = extras
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ColumnarEntry(self, row) for row in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('ColumnarList index out of range')
+        return ColumnarEntry(self, index)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield ColumnarEntry(self, row)
+
+    def value(self, row, key):
+        if row in self.absent and key in self.absent[row]:
+            raise KeyError(key)
+
+        if key == 'id':
+            return self.ids[row]
+        elif key == 'score':
+            return self.scores[row]
+        elif key == self.status_key:
+            return statuses[self.entity][self.statuses[row]]
+        elif key == 'last_updated':
+            return self.last_updated[row]
+        elif key in self.progress:
+            return self.progress[key][row]
+        elif key in title_keys:
+            return self.titles.get(self.ids[row])[key]
+        return self.extras.get(row, {})[key]
+
+    def keys_for(self, row):
+        keys = ['id', 'score', self.status_key, 'last_updated'] + list(self.progress.keys())
+        if row in self.absent:
+            keys = [key for key in keys if key not in self.absent[row]]
+        keys += list(self.titles.get(self.ids[row]).keys())
+        keys += list(self.extras.get(row, {}).keys())
+        return keys
+
+    def to_dicts(self):
+        return [dict(item) for item in self]
+
+    def score_lookup(self):
+        return {mal_id: score for mal_id, score in zip(self.ids, self.scores) if score > 0}
+
+    def score_summary(self):
+        scored = [score for score in self.scores if score > 0]
+        return len(scored), sum(scored)
+
+    def status_counts(self):
+        counts = {status: 0 for status in statuses[self.entity]}
+        for code in self.statuses:
+            counts[statuses[self.entity][code]] += 1
+        return counts
+
+
+class ColumnarEntry(Mapping):
+    __slots__ = ['columns', 'row']
+
+    def __init__(self, columns, row):
+        self.columns = columns
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.columns.value(self.row, key)
+
+    def __iter__(self):
+        return iter(self.columns.keys_for(self.row))
+
+    def __len__(self):
+        return len(self.columns.keys_for(self.row))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def score_lookup(entity_list):
+    if isinstance(entity_list, ColumnarList):
+        return entity_list.score_lookup()
+    return {item['id']: item['score'] for item in entity_list if 'score' in item and item['score'] > 0}
+
+
+def score_summary(entity_list):
+    if isinstance(entity_list, ColumnarList):
+        return entity_list.score_summary()
+    scored = [item['score'] for item in entity_list if item['score'] > 0]
+    return len(scored), sum(scored)
+
+
+def serializable(entity_list):
+    if isinstance(entity_list, ColumnarList):
+        return entity_list.to_dicts()
+    return entity_list
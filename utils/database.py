@@ -1,9 +1,11 @@
 import os
 import sys
+from contextlib import contextmanager
 from sqlalchemy import Table, Column, ForeignKey, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy import create_engine, event
 
 Base = declarative_base()
 
@@ -88,12 +90,51 @@ class UserBadge(Base):
 
 ##########################################
 
+engine = None
+Session = None
+
+sqlite_pragmas = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-8000',
+    'PRAGMA busy_timeout=5000',
+]
+
+def get_engine():
+    global engine, Session
+    if engine is None:
+        # Everything runs on the event loop thread, so overflow is unbounded rather than
+        # blocking the loop while waiting for a connection. Commands go through session_scope,
+        # so overflow only grows while interactive commands (!user setup...) wait on the user
+        engine = create_engine('sqlite:///data/users.db', encoding='utf-8',
+                               connect_args={'check_same_thread': False},
+                               poolclass=QueuePool, pool_size=5, max_overflow=-1)
+        event.listen(engine, 'connect', set_sqlite_pragmas)
+        Base.metadata.bind = engine
+        Session = sessionmaker(bind=engine)
+    return engine
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas:
+        cursor.execute(pragma)
+    cursor.close()
+
 def setup_database():
-    engine = create_engine('sqlite:///data/users.db', encoding='utf-8')
-    Base.metadata.create_all(engine)
+    Base.metadata.create_all(get_engine())
 
 def new_session():
-    engine = create_engine('sqlite:///data/users.db', encoding='utf-8')
-    Base.metadata.bind = engine
-    Session = sessionmaker(bind=engine)
+    get_engine()
     return Session()
+
+@contextmanager
+def session_scope():
+    session = new_session()
+    try:
+        yield session
+    except:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import asyncio
+import itertools
+import time
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_COMMAND = 1
+PRIORITY_BACKGROUND = 2
+
+
+class TokenBucket():
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.lock = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    async def acquire(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            self.refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+
+class FetchJob():
+    def __init__(self, loader):
+        self.loader = loader
+        self.future = asyncio.Future()
+        self.started = False
+
+
+class FetchScheduler():
+    def __init__(self, workers=8):
+        self.workers = workers
+        self.queue = None
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.running = []
+        self.stats = {'scheduled': 0, 'coalesced': 0, 'completed': 0, 'failed': 0}
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.PriorityQueue()
+        self.running = [task for task in self.running if not task.done()]
+        while len(self.running) < self.workers:
+            self.running.append(asyncio.ensure_future(self.worker()))
+
+    async def fetch(self, key, loader, priority=PRIORITY_COMMAND):
+        """Runs loader() once for all concurrent callers asking for the same key"""
+        self.start()
+
+        job = self.jobs.get(key)
+        if job is None:
+            job = self.jobs[key] = FetchJob(loader)
+            self.stats['scheduled'] += 1
+        else:
+            self.stats['coalesced'] += 1
+
+        # A job can be queued several times, so a more urgent caller bumps it ahead of the background work
+        if not job.started:
+            self.queue.put_nowait((priority, next(self.counter), key))
+
+        return await asyncio.shield(job.future)
+
+    def is_pending(self, key):
+        return key in self.jobs
+
+    async def worker(self):
+        while True:
+            priority, order, key = await self.queue.get()
+            job = self.jobs.get(key)
+            if job is None or job.started:
+                continue
+
+            job.started = True
+            try:
+                job.future.set_result(await job.loader())
+                self.stats['completed'] += 1
+            except Exception as e:
+                job.future.set_exception(e)
+                self.stats['failed'] += 1
+            finally:
+                del self.jobs[key]
+
+    def statistics(self):
+        stats = dict(self.stats)
+        stats['pending'] = len([job for job in self.jobs.values() if not job.started])
+        stats['running'] = len([job for job in self.jobs.values() if job.started])
+        return stats
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import urllib.parse
+import aiohttp
+
+class HTTPPool():
+    def __init__(self, limit=100, limit_per_host=8, keepalive_timeout=60, dns_cache_ttl=600, timeout=30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+
+        self.session = None
+        self.stats = {'requests': 0, 'failures': 0, 'timeouts': 0, 'bytes': 0}
+        self.host_requests = {}
+
+    def get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout,
+                                             use_dns_cache=True,
+                                             ttl_dns_cache=self.dns_cache_ttl)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def read(self, url, timeout=None):
+        host = urllib.parse.urlparse(url).netloc
+        self.stats['requests'] += 1
+        self.host_requests[host] = self.host_requests.get(host, 0) + 1
+
+        async def fetch():
+            async with self.get_session().get(url) as response:
+                return await response.read()
+
+        try:
+            data = await asyncio.wait_for(fetch(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            raise
+        except Exception:
+            self.stats['failures'] += 1
+            raise
+
+        self.stats['bytes'] += len(data)
+        return data
+
+    async def text(self, url, timeout=None):
+        return (await self.read(url, timeout=timeout)).decode('utf-8')
+
+    async def json(self, url, timeout=None):
+        return json.loads(await self.read(url, timeout=timeout))
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def statistics(self):
+        stats = dict(self.stats)
+        connector = self.session.connector if self.session is not None and not self.session.closed else None
+        if connector is not None:
+            stats['idle_connections'] = sum(len(items) for items in getattr(connector, '_conns', {}).values())
+            stats['active_connections'] = len(getattr(connector, '_acquired', []))
+        else:
+            stats['idle_connections'] = 0
+            stats['active_connections'] = 0
+        stats['hosts'] = dict(self.host_requests)
+        return stats
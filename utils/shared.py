@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 import discord
-from utils import cached_data, bot_state
+from utils import cached_data, bot_state, avatar_cache
 
 reaction_ok = '✅'
 reaction_ko = '❌'
@@ -26,6 +26,7 @@ admin = ''
 version = '0.77'
 cache = cached_data.CachedData()
 state = bot_state.BotState()
+avatars = avatar_cache.AvatarCache()
 name_restriction = {}
 banlist = {}
 
@@ -4,7 +4,7 @@ import asyncio
 import pytz
 import datetime
 import pycountry
-import urllib.parse, urllib.request, json
+import json
 import discord
 import re
 from discord.ext.commands import converter, errors
@@ -12,6 +12,9 @@ from discord import utils
 
 from utils import database, shared
 
+# Upper bound for a single imal.iatgof.com request made while a user waits on a command
+api_timeout = 15
+
 
 def age_from_birthdate(birthdate):
     born = datetime.datetime.strptime(birthdate, '%Y-%m-%d')
@@ -58,22 +61,15 @@ async def require_mal_username(ctx, member):
     if member is None:
         member = ctx.message.author
 
-    session = database.new_session()
-    user = session.query(database.User).filter(database.User.discord_id == member.id).first()
+    with database.session_scope() as session:
+        user = session.query(database.User).filter(database.User.discord_id == member.id).first()
+        mal_name = user.mal_name if user else None
 
-    if user is None or user.mal_name is None:
+    if mal_name is None:
         await ctx.bot.say(f'{member.name} has not set their MAL username!')
         return None
-    return user.mal_name
-
+    return mal_name
 
-def silent_picture_grab(mal_user):
-    try:
-        with urllib.request.urlopen(f'https://imal.iatgof.com/app.php/2.2/profile/{mal_user}') as url:
-            data = json.loads(url.read().decode())
-            return data['avatar_url']
-    except:
-        return None
 
 def read_property(name, default=None):
     with open('data/properties.json') as file:
@@ -150,18 +146,18 @@ class AndreMemberConverter(converter.IDConverter):
             else:
                 result = converter._get_from_servers(bot, 'get_member', user_id)
 
-        # Exact MAL match
-        session = database.new_session()
-        if result is None:
-            result = self.convert_get_from_mal(session, server, bot, self.argument)
+        with database.session_scope() as session:
+            # Exact MAL match
+            if result is None:
+                result = self.convert_get_from_mal(session, server, bot, self.argument)
 
-        # Fuzzy discord match
-        if result is None:
-            result = self.convert_get_from_member(server, bot, 'get_member_named_fuzzy')
+            # Fuzzy discord match
+            if result is None:
+                result = self.convert_get_from_member(server, bot, 'get_member_named_fuzzy')
 
-        # Fuzzy MAL match
-        if result is None:
-            result = self.convert_get_from_mal(session, server, bot, f'%{self.argument}%')
+            # Fuzzy MAL match
+            if result is None:
+                result = self.convert_get_from_mal(session, server, bot, f'%{self.argument}%')
 
         if result is None:
             raise errors.BadArgument('Member "{}" not found'.format(self.argument))
@@ -263,12 +259,11 @@ class UserLookup:
     def __init__(self, bot):
         self.bot = bot
 
-        session = database.new_session()
-        users = session.query(database.User).all()
         table = {}
-        for user in users:
-            if user.mal_name:
-                table[user.mal_name] = user.discord_id
+        with database.session_scope() as session:
+            for user in session.query(database.User).all():
+                if user.mal_name:
+                    table[user.mal_name] = user.discord_id
 
         self.mal_table = table
         self.user_id_cache = {}
@@ -1,72 +1,191 @@
-import socket
+import asyncio
+import collections
+import ssl
 import json
+import os
 import time
-import aiohttp
 import zlib
 import bbcode
 
 import utils
+from utils import vndb_index
 
 class vndbException(Exception):
     pass
 
+class QueryCache(object):
+    def __init__(self, ttl=3600 * 12, max_entries=2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None or time.time() >= item[0] + self.ttl:
+            if item is not None:
+                del self.items[key]
+            self.misses += 1
+            return None
+
+        self.items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key, value):
+        self.items[key] = (time.time(), value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_entries:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+    def statistics(self):
+        total = self.hits + self.misses
+        return {'entries': len(self.items), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0}
+
+
 class VNDB(object):
     protocol = 1
     clientname = 'andre'
     clientver = '0.1'
 
-    def __init__(self, username=None, password=None, debug=False):
-        self.sock = socket.socket()
-
-        if debug: print('Connecting to api.vndb.org')
-        self.sock.connect(('api.vndb.org', 19534))
-        if debug: print('Connected')
-
-        if debug: print('Authenticating')
-        if (username == None) or (password == None):
-            self.sendCommand('login', {'protocol': self.protocol, 'client': self.clientname,
-                                       'clientver': float(self.clientver)})
-        else:
-            self.sendCommand('login', {'protocol': self.protocol, 'client': self.clientname,
-                                       'clientver': float(self.clientver), 'username': username, 'password': password})
-        res = self.getRawResponse()
-        if res.find('error ') == 0:
-            raise vndbException(json.loads(' '.join(res.split(' ')[1:]))['msg'])
-        if debug: print('Authenticated')
-
-        self.cache = {'get': []}
-        self.cachetime = 3600 * 12  # cache stuff for 12 hours
-
-    def close(self):
-        self.sock.close()
-
-    def get(self, type, flags, filters, options):
-        args = '{0} {1} {2} {3}'.format(type, flags, filters, options)
-        for item in self.cache['get']:
-            if (item['query'] == args) and (time.time() < (item['time'] + self.cachetime)):
-                return item['results']
-
-        self.sendCommand('get', args)
-        res = self.getResponse()[1]
-        self.cache['get'].append({'time': time.time(), 'query': args, 'results': res})
+    def __init__(self, username=None, password=None, host='api.vndb.org', port=19535, use_ssl=True, max_pending=10, timeout=30, cache=None, debug=False):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.debug = debug
+
+        self.reader = None
+        self.writer = None
+        self.read_task = None
+        self.connect_lock = asyncio.Lock()
+        # Responses come back in the order the commands were sent
+        self.pending = collections.deque()
+        self.slots = asyncio.Semaphore(max_pending)
+
+        self.cache = cache if cache is not None else QueryCache()
+
+    @property
+    def connected(self):
+        return self.writer is not None and self.read_task is not None and not self.read_task.done()
+
+    async def connect(self):
+        async with self.connect_lock:
+            if self.connected:
+                return
+
+            if self.debug: print(f'Connecting to {self.host}')
+            context = ssl.create_default_context() if self.use_ssl else None
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port, ssl=context), self.timeout)
+            if self.debug: print('Connected')
+
+            if self.debug: print('Authenticating')
+            login = {'protocol': self.protocol, 'client': self.clientname, 'clientver': float(self.clientver)}
+            if self.username is not None and self.password is not None:
+                login['username'] = self.username
+                login['password'] = self.password
+            self.writer.write(self.encodeCommand('login', login))
+            try:
+                res = await asyncio.wait_for(self.getRawResponse(), self.timeout)
+            except Exception:
+                self.disconnect()
+                raise
+            if res.find('error ') == 0:
+                self.disconnect()
+                raise vndbException(json.loads(' '.join(res.split(' ')[1:]))['msg'])
+            if self.debug: print('Authenticated')
+
+            self.read_task = asyncio.ensure_future(self.readResponses())
+
+    def disconnect(self, error=None):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = None
+        self.writer = None
+
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(error or ConnectionError('Connection to VNDB closed'))
+
+    def abort(self, error=None):
+        """Drops the connection and fails every pending command, so no later response can be matched to the wrong one"""
+        if self.read_task is not None:
+            self.read_task.cancel()
+            self.read_task = None
+        self.disconnect(error)
+
+    async def close(self):
+        self.abort()
+
+    async def get(self, type, flags, filters, options):
+        args = self.queryString(type, flags, filters, options)
+        res = self.cache.get(args)
+        if res is not None:
+            return res
+
+        res = (await self.sendCommand('get', args))[1]
+        self.cache.set(args, res)
         return res
 
-    def sendCommand(self, command, args=None):
-        whole = ''
-        whole += command.lower()
-        if isinstance(args, str):
-            whole += ' ' + args
-        elif isinstance(args, dict):
-            whole += ' ' + json.dumps(args)
-
-        self.sock.send('{0}\x04'.format(whole).encode())
-
-    def getResponse(self):
-        args = {}
-        res = self.getRawResponse()
-        cmdname = res.split(' ')[0]
-        if len(res.split(' ')) > 1:
-            args = json.loads(' '.join(res.split(' ')[1:]))
+    async def getByIds(self, type, flags, ids, page_size=25):
+        """Returns {id: item}, fetching the ids missing from the cache with one (id = [...]) query per page"""
+        found = {}
+        missing = []
+        for id in dict.fromkeys(ids):
+            res = self.cache.get(self.queryString(type, flags, f'(id={id})', ''))
+            if res is not None:
+                if res['items']:
+                    found[id] = res['items'][0]
+            else:
+                missing.append(id)
+
+        for start in range(0, len(missing), page_size):
+            chunk = missing[start:start + page_size]
+            filters = '(id = {})'.format(json.dumps(chunk))
+            page = 1
+            while True:
+                options = json.dumps({'page': page, 'results': page_size})
+                res = (await self.sendCommand('get', self.queryString(type, flags, filters, options)))[1]
+                for item in res['items']:
+                    found[item['id']] = item
+                    # Same entry a single (id=...) query would have produced
+                    self.cache.set(self.queryString(type, flags, f'(id={item["id"]})', ''), {'items': [item], 'more': False, 'num': 1})
+                if not res.get('more'):
+                    break
+                page += 1
+        return found
+
+    def queryString(self, type, flags, filters, options):
+        return '{0} {1} {2} {3}'.format(type, flags, filters, options)
+
+    async def sendCommand(self, command, args=None):
+        async with self.slots:
+            if not self.connected:
+                await self.connect()
+
+            future = asyncio.Future()
+            self.pending.append(future)
+            self.writer.write(self.encodeCommand(command, args))
+            await self.writer.drain()
+
+            try:
+                cmdname, args = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                self.abort(ConnectionError('VNDB command timed out'))
+                self.discard(future)
+                raise
+            except asyncio.CancelledError:
+                self.abort(ConnectionError('VNDB command cancelled'))
+                self.discard(future)
+                raise
 
         if cmdname == 'error':
             if args['id'] == 'throttled':
@@ -75,25 +194,62 @@ class VNDB(object):
                 raise vndbException(args['msg'])
         return (cmdname, args)
 
-    def getRawResponse(self):
-        finished = False
+    def discard(self, future):
+        # Nobody awaits this future anymore, retrieve its exception so asyncio doesn't log it
+        if future.done() and not future.cancelled():
+            future.exception()
+
+    def encodeCommand(self, command, args=None):
         whole = ''
-        while not finished:
-            whole += self.sock.recv(4096).decode('utf-8')
-            if '\x04' in whole: finished = True
-        return whole.replace('\x04', '').strip()
+        whole += command.lower()
+        if isinstance(args, str):
+            whole += ' ' + args
+        elif isinstance(args, dict):
+            whole += ' ' + json.dumps(args)
+        return '{0}\x04'.format(whole).encode()
+
+    async def readResponses(self):
+        # A replaced connection must not be torn down when this task finally stops
+        writer = self.writer
+        error = None
+        try:
+            while True:
+                res = await self.getRawResponse()
+                if not self.pending:
+                    continue
+
+                args = {}
+                cmdname = res.split(' ')[0]
+                if len(res.split(' ')) > 1:
+                    args = json.loads(' '.join(res.split(' ')[1:]))
+
+                future = self.pending.popleft()
+                if not future.done():
+                    future.set_result((cmdname, args))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.debug: print(f'VNDB connection lost: {e}')
+            error = e
+        finally:
+            if self.writer is writer:
+                self.disconnect(error)
+
+    async def getRawResponse(self):
+        whole = await self.reader.readuntil(b'\x04')
+        return whole.decode('utf-8').replace('\x04', '').strip()
 
 
 class VNDBStatic(object):
 
-    def __init__(self):
+    def __init__(self, http_pool):
+        self.http_pool = http_pool
         self.cache = {'tags': None, 'traits': None}
         self.cache_last = {}
         self.cache_last['tags'] = utils.utils.read_property('vndb_cache_tags')
         self.cache_last['traits'] = utils.utils.read_property('vndb_cache_traits')
-
-        self.load_from_cache('tags')
-        self.load_from_cache('traits')
+        # Dumps are opened on first use rather than at startup
+        self.index_tasks = {}
 
         self.bbcode_parser = self.build_bbcode_parser()
         self.bbcode_parser_spoil = self.build_bbcode_parser(spoiler=True)
@@ -104,8 +260,23 @@ class VNDBStatic(object):
         cache_limit = 3600 * 24
         if self.cache_last[identifier] and time.time() - self.cache_last[identifier] < cache_limit:
             if not self.cache[identifier]:
-                with open(f'data/cache/vndb_{identifier}.json') as f:
-                    self.cache[identifier] = json.load(f)
+                try:
+                    if os.path.exists(self.index_path(identifier)):
+                        self.cache[identifier] = vndb_index.DumpIndex(self.index_path(identifier))
+                    else:
+                        # Dumps cached as JSON before the binary index existed
+                        with open(f'data/cache/vndb_{identifier}.json') as f:
+                            data = json.load(f)
+                        if any('roots' not in item for item in data.values()):
+                            self.build_ancestry(data)
+                        self.cache[identifier] = data
+                        self.schedule_index(identifier, data)
+                except (OSError, ValueError) as e:
+                    # Missing, corrupt or older format dump, download it again
+                    print(f'Could not load cached {identifier}: {e}')
+                    self.cache[identifier] = None
+                    self.cache_last[identifier] = None
+                    return None
             return self.cache[identifier]
         else:
             self.cache[identifier] = None
@@ -117,9 +288,28 @@ class VNDBStatic(object):
         self.cache[identifier] = data
         self.cache_last[identifier] = now
 
-        utils.utils.write_property(f'vndb_cache_{identifier}', now)
-        with open(f'data/cache/vndb_{identifier}.json', 'w') as f:
-            json.dump(data, f)
+        self.schedule_index(identifier, data, updated=now)
+
+    def index_path(self, identifier):
+        return f'data/cache/vndb_{identifier}.idx'
+
+    def schedule_index(self, identifier, data, updated=None):
+        """Writes the binary index in a worker thread, then swaps the in-memory dump for the mapped file
+
+        The cache timestamp is only saved once the index is on disk, so a failed write or a restart can't
+        leave a fresh timestamp pointing at a missing or outdated dump"""
+        async def build_index():
+            try:
+                path = self.index_path(identifier)
+                await asyncio.get_event_loop().run_in_executor(None, vndb_index.write_index, path, data)
+                if updated is not None:
+                    utils.utils.write_property(f'vndb_cache_{identifier}', updated)
+                if self.cache[identifier] is data:
+                    self.cache[identifier] = vndb_index.DumpIndex(path)
+            except Exception as e:
+                print(f'Could not write {identifier} index: {e}')
+
+        self.index_tasks[identifier] = asyncio.ensure_future(build_index())
 
     def extract_data(self, identifier, raw):
         if identifier == 'tags':
@@ -127,32 +317,56 @@ class VNDBStatic(object):
             for item in raw:
                 parents_string = list(map(lambda x: str(x), item['parents']))
                 data[str(item['id'])] = {'name': item['name'], 'parents': parents_string, 'cat': item['cat']}
-            return data
+            return self.build_ancestry(data)
         elif identifier == 'traits':
             data = {}
             for item in raw:
                 parents_string = list(map(lambda x: str(x), item['parents']))
                 data[str(item['id'])] = {'name': item['name'], 'parents': parents_string}
-            return data
+            return self.build_ancestry(data)
         return raw
 
+    def build_ancestry(self, data):
+        """Stores the top-level ancestors ('roots') and the distance to the closest one ('depth') in every item"""
+        def visit(id):
+            item = data[id]
+            if 'roots' in item:
+                return item
+
+            parents = [parent for parent in item['parents'] if parent in data]
+            if not item['parents']:
+                item['roots'], item['depth'] = [id], 0
+            elif not parents:
+                item['roots'], item['depth'] = [], 0
+            else:
+                roots = {}
+                for parent in parents:
+                    roots.update(dict.fromkeys(visit(parent)['roots']))
+                item['roots'] = list(roots)
+                item['depth'] = 1 + min(data[parent]['depth'] for parent in parents)
+            return item
+
+        for item in data.values():
+            item.pop('roots', None)
+        for id in data:
+            visit(id)
+        return data
+
     async def require_data(self, identifier):
         data = self.load_from_cache(identifier)
         if data:
             return data
 
         print(f'Will load {identifier}')
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f'https://vndb.org/api/{identifier}.json.gz') as response:
-                try:
-                    raw_json = zlib.decompress(await response.read(), 16+zlib.MAX_WBITS)
-                    data = json.loads(raw_json)
-                    data = self.extract_data(identifier, data)
-                    self.cache_new_data(identifier, data)
-                    return data
-                except Exception as e:
-                    print(e)
-                    return None
+        try:
+            raw_json = zlib.decompress(await self.http_pool.read(f'https://vndb.org/api/{identifier}.json.gz'), 16+zlib.MAX_WBITS)
+            data = json.loads(raw_json)
+            data = self.extract_data(identifier, data)
+            self.cache_new_data(identifier, data)
+            return data
+        except Exception as e:
+            print(e)
+            return None
 
     def game_length(self, id):
         lengths = {1: 'Very short (< 2 hours)',
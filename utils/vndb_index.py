@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import array
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+
+# Layout, all integers in native byte order:
+#   header   magic, version, item count, string count, id list length
+#   strings  string count + 1 offsets (uint32) into the utf-8 blob that follows
+#   ids      sorted item ids (uint32), searched with bisect
+#   records  per item: name, cat (string index or NONE), depth, parents start/count, roots start/count
+#   lists    parent and root ids (uint32) referenced by the records
+magic = b'VNDX'
+version = 1
+header_format = '4sIIII'
+NONE = 0xFFFFFFFF
+
+
+def write_index(path, data):
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return NONE
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    ids = sorted(int(id) for id in data)
+    records = array.array('I')
+    lists = array.array('I')
+    for id in ids:
+        item = data[str(id)]
+        parents = [int(parent) for parent in item['parents']]
+        roots = [int(root) for root in item.get('roots', [])]
+        records.extend([intern(item['name']), intern(item.get('cat')), item.get('depth', 0),
+                        len(lists), len(parents), len(lists) + len(parents), len(roots)])
+        lists.extend(parents)
+        lists.extend(roots)
+
+    blob = bytearray()
+    offsets = array.array('I', [0])
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(handle, 'wb') as f:
+        f.write(struct.pack(header_format, magic, version, len(ids), len(strings), len(lists)))
+        f.write(offsets.tobytes())
+        f.write(bytes(blob))
+        # Keep the integer sections aligned for memoryview.cast
+        f.write(b'\0' * (-f.tell() % 4))
+        f.write(array.array('I', ids).tobytes())
+        f.write(records.tobytes())
+        f.write(lists.tobytes())
+    os.replace(temp_path, path)
+
+
+class DumpIndex(object):
+    """Read-only view of an index written by write_index, with the same get() interface as the extracted dump dict"""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        file_magic, file_version, count, string_count, list_count = struct.unpack_from(header_format, self.map, 0)
+        if file_magic != magic or file_version != version:
+            self.map.close()
+            raise ValueError(f'{path} is not a version {version} index')
+
+        view = memoryview(self.map)
+        position = struct.calcsize(header_format)
+        self.string_offsets = view[position:position + 4 * (string_count + 1)].cast('I')
+        position += 4 * (string_count + 1)
+        self.strings_start = position
+        position += self.string_offsets[-1]
+        position += -position % 4
+
+        self.ids = view[position:position + 4 * count].cast('I')
+        position += 4 * count
+        self.records = view[position:position + 4 * 7 * count].cast('I')
+        position += 4 * 7 * count
+        self.lists = view[position:position + 4 * list_count].cast('I')
+
+        self.strings = [None] * string_count
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return self.position(id) is not None
+
+    def position(self, id):
+        try:
+            id = int(id)
+        except (TypeError, ValueError):
+            return None
+        i = bisect.bisect_left(self.ids, id)
+        return i if i < len(self.ids) and self.ids[i] == id else None
+
+    def string(self, index):
+        if index == NONE:
+            return None
+        if self.strings[index] is None:
+            start = self.strings_start + self.string_offsets[index]
+            end = self.strings_start + self.string_offsets[index + 1]
+            self.strings[index] = self.map[start:end].decode('utf-8')
+        return self.strings[index]
+
+    def get(self, id, default=None):
+        i = self.position(id)
+        if i is None:
+            return default
+
+        name, cat, depth, parents_start, parents_count, roots_start, roots_count = self.records[7 * i:7 * i + 7]
+        item = {'name': self.string(name),
+                'parents': [str(parent) for parent in self.lists[parents_start:parents_start + parents_count]],
+                'roots': [str(root) for root in self.lists[roots_start:roots_start + roots_count]],
+                'depth': depth}
+        if cat != NONE:
+            item['cat'] = self.string(cat)
+        return item
+
+    def __getitem__(self, id):
+        item = self.get(id)
+        if item is None:
+            raise KeyError(id)
+        return item
+
+    def close(self):
+        for view in [self.string_offsets, self.ids, self.records, self.lists]:
+            view.release()
+        self.map.close()